@@ -0,0 +1,264 @@
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+import pandas as pd
+import pyarrow as pa
+
+import datos
+import kpis
+
+# Todas las pestañas se calculan a partir de dos agregados: el cubo, por
+# tienda/producto/mes/promoción, y el calendario, para las vistas que dependen
+# del día concreto (semana del año, día de la semana y tipo de festivo). Un único
+# cubo con todas esas claves tendría tantas celdas como filas el dataset, porque
+# la semana, el día y el festivo dependen de la fecha.
+CLAVES_CUBO = ["state", "store_nbr", "family", "year", "month", "promo"]
+CLAVES_CALENDARIO = ["week", "day_of_week", "holiday_type"]
+MEDIDAS_CUBO = ["sales", "transactions"]
+MEDIDAS_CALENDARIO = ["sales"]
+FILAS_TROZO = 1_000_000
+
+# Motor con el que se agregan las filas: "pandas" (groupby) o "duckdb", que lanza
+# las mismas sumas como SQL en un DuckDB embebido directamente sobre tablas Arrow
+# (el snapshot mapeado en memoria o los CSV leídos con pyarrow), sin convertirlas
+# a pandas. Solo cambia la construcción del cubo y el calendario: las pestañas
+# leen el cubo, que ya es pequeño. Con "duckdb" hace falta tener duckdb instalado.
+MOTOR = os.environ.get("VENTAS_MOTOR", "pandas")
+
+# El cubo se guarda ordenado por sus claves, empezando por estado y tienda, para
+# poder cortarlo por posición con datos.indice_cortes().
+#
+# Los agregados se guardan junto a los datos con la misma huella que el snapshot
+RUTA_CUBO = "cubo_ventas.arrow"
+RUTA_CALENDARIO = "cubo_calendario.arrow"
+VERSION_CUBO = "2-" + datos.VERSION_ESQUEMA
+
+
+# Cada celda guarda suma, suma de cuadrados y número de filas, lo que basta para
+# reconstruir totales, medias y desviaciones a cualquier nivel de agregación.
+def _agregar(df, claves, medidas):
+    valores = {}
+    for medida in medidas:
+        valores[f"suma_{medida}"] = df[medida]
+        valores[f"suma2_{medida}"] = df[medida] ** 2
+    valores["n"] = 1
+    return (
+        pd.DataFrame(valores, index=df.index)
+        .groupby(claves, observed=True, dropna=False)
+        .sum()
+        .reset_index()
+    )
+
+
+# Con la dimensión de fechas (ver datos.separar_fechas()) los atributos de
+# calendario que ya no están en el frame se recuperan por código de día
+def _claves(df, fechas, claves):
+    return [df[clave] if clave in df else datos.columna_fecha(df, fechas, clave) for clave in claves]
+
+
+def agregar(df, fechas=None):
+    cubo = _agregar(df, _claves(df, fechas, CLAVES_CUBO), MEDIDAS_CUBO)
+    calendario = _agregar(df, _claves(df, fechas, CLAVES_CALENDARIO), MEDIDAS_CALENDARIO)
+    return datos.ordenar_datos(cubo, CLAVES_CUBO), calendario
+
+
+# La limpieza de datos.limpiar_datos() se hace sobre el resultado y no fila a
+# fila: se agrupa por los textos tal cual vienen (con espacios o marcas de nulo),
+# luego se limpian las claves del agregado, que son pocas, y se vuelven a sumar
+# las celdas que coinciden. Las medidas nulas no cuentan en sum(), como si fueran
+# 0. Así la misma consulta vale para las filas crudas de los CSV y para el
+# snapshot, que ya está limpio.
+EXPRESIONES_SQL = {"promo": "coalesce(onpromotion > 0, false) AS promo"}
+
+
+def _sql_agregar(claves, medidas):
+    columnas = [EXPRESIONES_SQL.get(clave, clave) for clave in claves]
+    for medida in medidas:
+        columnas.append(f"coalesce(sum({medida}), 0) AS suma_{medida}")
+        columnas.append(f"coalesce(sum({medida} * {medida}), 0) AS suma2_{medida}")
+    return f"SELECT {', '.join(columnas)}, count(*) AS n FROM filas GROUP BY ALL"
+
+
+def _limpiar_claves(agregado, claves):
+    for col in datos.COLUMNAS_TEXTO:
+        if col in agregado:
+            limpias = agregado[col].str.strip()
+            agregado[col] = limpias.where(~limpias.isin(datos.NULOS))
+    return agregado.groupby(claves, dropna=False).sum().reset_index()
+
+
+def agregar_duckdb(tabla, fechas=None):
+    try:
+        import duckdb
+    except ImportError as error:
+        raise ImportError("VENTAS_MOTOR=duckdb necesita el paquete duckdb: pip install duckdb") from error
+
+    con = duckdb.connect()
+    try:
+        if fechas is None:
+            con.register("filas", tabla)
+        else:
+            con.register("sin_fechas", tabla)
+            con.register("fechas", pa.Table.from_pandas(fechas, preserve_index=False))
+            con.execute("CREATE VIEW filas AS SELECT * FROM sin_fechas JOIN fechas USING (dia)")
+        cubo = con.execute(_sql_agregar(CLAVES_CUBO, MEDIDAS_CUBO)).df()
+        calendario = con.execute(_sql_agregar(CLAVES_CALENDARIO, MEDIDAS_CALENDARIO)).df()
+    finally:
+        con.close()
+    cubo = _limpiar_claves(cubo, CLAVES_CUBO)
+    calendario = _limpiar_claves(calendario, CLAVES_CALENDARIO)
+    tipo = "float32" if datos.FLOAT32 else "float64"
+    for agregado in (cubo, calendario):
+        for col in agregado.columns:
+            if col.startswith("suma"):
+                agregado[col] = agregado[col].astype(tipo)
+    return datos.ordenar_datos(categorizar(cubo), CLAVES_CUBO), categorizar(calendario)
+
+
+def combinar(a, b, claves):
+    return (
+        pd.concat([a, b], ignore_index=True)
+        .groupby(claves, observed=True, dropna=False, sort=False)
+        .sum()
+        .reset_index()
+    )
+
+
+def categorizar(agregado):
+    for col in datos.COLUMNAS_TEXTO:
+        if col in agregado:
+            agregado[col] = agregado[col].astype("category")
+    return agregado
+
+
+def _parciales(ruta, filas, motor):
+    if motor == "duckdb":
+        for trozo in datos.leer_zip_arrow_por_trozos(ruta, filas):
+            yield agregar_duckdb(trozo)
+        return
+    for trozo in datos.leer_zip_por_trozos(ruta, filas):
+        yield agregar(datos.derivar_columnas(datos.limpiar_datos(trozo)))
+
+
+# Modo solo agregados: cada trozo de CSV se limpia, se suma a los acumulados y se
+# descarta, de modo que la memoria depende del tamaño de los agregados y no del
+# número de filas. Con DuckDB los trozos son tablas Arrow leídas en streaming.
+def agregar_por_trozos(rutas=None, filas=FILAS_TROZO, motor=MOTOR):
+    rutas = datos.descubrir_partes() if rutas is None else rutas
+    cubo = calendario = None
+    for ruta in rutas:
+        for parcial_cubo, parcial_calendario in _parciales(ruta, filas, motor):
+            if cubo is None:
+                cubo, calendario = parcial_cubo, parcial_calendario
+            else:
+                cubo = combinar(cubo, parcial_cubo, CLAVES_CUBO)
+                calendario = combinar(calendario, parcial_calendario, CLAVES_CALENDARIO)
+    return datos.ordenar_datos(categorizar(cubo), CLAVES_CUBO), categorizar(calendario)
+
+
+def guardar(cubo, calendario, huella, directorio="."):
+    datos.guardar_snapshot(cubo, huella, os.path.join(directorio, RUTA_CUBO), VERSION_CUBO)
+    datos.guardar_snapshot(calendario, huella, os.path.join(directorio, RUTA_CALENDARIO), VERSION_CUBO)
+
+
+def cargar(huella, directorio="."):
+    cubo = datos.cargar_snapshot(huella, os.path.join(directorio, RUTA_CUBO), version=VERSION_CUBO)
+    calendario = datos.cargar_snapshot(huella, os.path.join(directorio, RUTA_CALENDARIO), version=VERSION_CUBO)
+    if cubo is None or calendario is None:
+        return None
+    return cubo, calendario
+
+
+# Ingesta incremental: la huella guardada con los agregados hace de manifiesto de
+# las partes ya procesadas (ruta, tamaño y hash de cada una). Si la huella actual
+# solo añade partes nuevas, se agregan esas partes por separado y se suman a los
+# agregados guardados, así que el coste depende del tamaño de las partes nuevas y
+# no del histórico. Devuelve None si no hay agregados guardados o si alguna parte
+# ya procesada ha cambiado.
+def actualizar(huella, directorio=".", modo="completo"):
+    guardada = huella_guardada(directorio)
+    nuevas = datos.partes_nuevas(guardada, huella) if guardada is not None else None
+    if not nuevas:
+        return None
+    anteriores = cargar(guardada, directorio)
+    if anteriores is None:
+        return None
+
+    if modo == "agregados":
+        cubo, calendario = agregar_por_trozos(nuevas)
+    elif MOTOR == "duckdb":
+        cubo, calendario = agregar_duckdb(datos.cargar_tabla(nuevas))
+    else:
+        cubo, calendario = agregar(datos.derivar_columnas(datos.limpiar_datos(datos.cargar_datos(nuevas))))
+    cubo = datos.ordenar_datos(categorizar(combinar(anteriores[0], cubo, CLAVES_CUBO)), CLAVES_CUBO)
+    calendario = categorizar(combinar(anteriores[1], calendario, CLAVES_CALENDARIO))
+    return cubo, calendario
+
+
+# Huella con la que se guardaron los agregados de un directorio (por ejemplo el
+# de precalcular.py), para cargarlos sin tener los zip de origen.
+def huella_guardada(directorio="."):
+    huella = datos.huella_snapshot(os.path.join(directorio, RUTA_CUBO), VERSION_CUBO)
+    if huella is None:
+        return None
+    return tuple(tuple(archivo) for archivo in huella)
+
+
+# Conjunto de datos que comparten todas las sesiones del servidor. Es de solo
+# lectura: las pestañas únicamente leen, cortan y agregan, y cualquier columna
+# nueva se añade sobre los resultados de resumir(), nunca sobre el cubo.
+@dataclass(frozen=True)
+class ConjuntoDatos:
+    huella: tuple
+    cubo: pd.DataFrame
+    calendario: pd.DataFrame
+    cortes: MappingProxyType = field(init=False)
+    rankings: MappingProxyType = field(init=False)
+    paretos: MappingProxyType = field(init=False)
+
+    def __post_init__(self):
+        cortes = {col: MappingProxyType(datos.indice_cortes(self.cubo, col)) for col in datos.COLUMNAS_CORTE}
+        object.__setattr__(self, "cortes", MappingProxyType(cortes))
+        object.__setattr__(self, "rankings", MappingProxyType(precalcular_rankings(self.cubo)))
+        paretos = {clave: kpis.pareto(self.cubo, clave) for clave in CLAVES_PARETO}
+        object.__setattr__(self, "paretos", MappingProxyType(paretos))
+
+
+# Rankings con conmutador media/total en la vista global: nombre -> (clave del
+# cubo, solo filas en promoción). Se calculan suma, filas y media en una sola
+# pasada y se guardan las dos variantes ya ordenadas.
+RANKINGS = {
+    "family": ("family", False),
+    "store_nbr": ("store_nbr", False),
+    "store_nbr_promo": ("store_nbr", True),
+}
+CLAVES_PARETO = ["store_nbr", "family"]
+
+
+def precalcular_rankings(cubo):
+    rankings = {}
+    for nombre, (clave, solo_promo) in RANKINGS.items():
+        origen = cubo[cubo["promo"]] if solo_promo else cubo
+        tabla = origen.groupby(clave, observed=True).agg(sum=("suma_sales", "sum"), count=("n", "sum"))
+        tabla["mean"] = tabla["sum"] / tabla["count"]
+        rankings[nombre] = {
+            estadistico: tabla[estadistico].rename("sales").sort_values(ascending=False).reset_index()
+            for estadistico in ("sum", "mean")
+        }
+    return rankings
+
+
+def resumir(agregado, por, medida="sales", estadistico="sum"):
+    grupos = agregado.groupby(por, observed=True)[[f"suma_{medida}", f"suma2_{medida}", "n"]].sum()
+    valor = grupos[f"suma_{medida}"]
+    if estadistico == "mean":
+        valor = valor / grupos["n"]
+    elif estadistico == "std":
+        varianza = (grupos[f"suma2_{medida}"] - valor ** 2 / grupos["n"]) / (grupos["n"] - 1)
+        valor = varianza.clip(lower=0) ** 0.5
+    return valor.rename(medida).reset_index()
+
+
+def media(agregado, medida="sales"):
+    return agregado[f"suma_{medida}"].sum() / agregado["n"].sum()
@@ -1,7 +1,16 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-import zipfile
+import functools
+import os
+import time
+
+import carga
+import graficos
+import motor
+import recarga
+import rendimiento
+from rendimiento import cronometro
 
 st.set_page_config(page_title="Dashboard de ventas", layout="wide")
 
@@ -99,46 +108,195 @@ COLOR_FEST = "#9467bd"
 COLOR_ESTADO = "#17becf"
 COLOR_REF = "#444444"
 
-def cargar_datos():
-    with zipfile.ZipFile("parte_1.csv.zip", "r") as z1:
-        n1 = [n for n in z1.namelist() if n.endswith(".csv") and "__MACOSX" not in n][0]
-        df1 = pd.read_csv(z1.open(n1), parse_dates=["date"])
-
-    with zipfile.ZipFile("parte_2.csv.zip", "r") as z2:
-        n2 = [n for n in z2.namelist() if n.endswith(".csv") and "__MACOSX" not in n][0]
-        df2 = pd.read_csv(z2.open(n2), parse_dates=["date"])
-
-    df = pd.concat([df1, df2], ignore_index=True)
-    return df
-
-df = cargar_datos()
-
-df["sales"] = df["sales"].fillna(0)
-df["transactions"] = df["transactions"].fillna(0)
-df["onpromotion"] = df["onpromotion"].fillna(0)
-
-df["day_of_week"] = df["day_of_week"].astype(str).str.strip()
-df["state"] = df["state"].astype(str).str.strip()
-df["family"] = df["family"].astype(str).str.strip()
+# Panel de rendimiento opcional (?perf=1 en la URL o VENTAS_PERF=1) con los
+# tiempos de este rerun: carga y limpieza (solo si no estaban en caché), cálculos
+# de la vista activa, construcción y filas enviadas de cada gráfico y memoria
+# residente del proceso. Cada fragmento pinta además su propio panel, que es el
+# que se actualiza cuando se vuelve a ejecutar solo.
+PERF = os.environ.get("VENTAS_PERF", "0") == "1" or st.query_params.get("perf") == "1"
+tiempos = {}
+graficos_pintados = []
+construidos = set()
+
+# Las consultas al motor se hacen fuera de los gráficos para que su tiempo
+# («cálculo: …») no se mezcle con el de construirlos
+def calcular(funcion, *argumentos):
+    with cronometro(tiempos, f"cálculo: {funcion.__name__}"):
+        return funcion(conjunto, *argumentos)
+
+def panel_rendimiento(titulo, tiempos_, pintados, total):
+    st.subheader(titulo)
+    st.metric("Memoria residente del proceso", f"{rendimiento.rss() / 2**20:,.0f} MB")
+    pintados = pd.DataFrame(pintados, columns=["gráfico", "ms", "filas", "origen"])
+    secciones = pd.Series(tiempos_, dtype=float) * 1000
+    calculos = secciones[secciones.index.str.startswith("cálculo: ")].sum()
+    secciones[f"{total} · cálculos"] = calculos
+    secciones[f"{total} · gráficos"] = pintados["ms"].sum()
+    secciones[f"{total} · resto"] = secciones[total] - calculos - pintados["ms"].sum()
+    st.dataframe(secciones.rename("ms").round(1))
+    st.dataframe(pintados.round({"ms": 1}), hide_index=True)
+
+# Va debajo de @st.fragment: mide cada ejecución de la sección (dentro de un rerun
+# completo o sola) y pinta su panel en la barra lateral. Como un fragmento se
+# vuelve a ejecutar sobre los registros del último rerun completo, solo cuenta
+# lo que cambia durante la sección.
+def medido(titulo):
+    def decorar(seccion):
+        @functools.wraps(seccion)
+        def ejecutar(*argumentos):
+            if not PERF:
+                return seccion(*argumentos)
+            antes, pintados_antes = dict(tiempos), len(graficos_pintados)
+            with cronometro(tiempos, f"fragmento: {titulo}"):
+                seccion(*argumentos)
+            propios = {
+                nombre: segundos - antes.get(nombre, 0)
+                for nombre, segundos in tiempos.items()
+                if segundos != antes.get(nombre, 0)
+            }
+            with st.sidebar:
+                panel_rendimiento(
+                    f"Rendimiento: {titulo}", propios, graficos_pintados[pintados_antes:], f"fragmento: {titulo}"
+                )
+        return ejecutar
+    return decorar
+
+# Los gráficos se construyen con funciones sin argumentos y su especificación se
+# guarda en caché por identificador, huella del dataset y valores de los filtros
+# de los que depende: en un rerun sin cambios no se vuelve a construir ni
+# serializar el gráfico. Es una caché compartida por todas las sesiones y acotada a
+# MAX_ESPECIFICACIONES entradas.
+@st.cache_resource(show_spinner=False, max_entries=graficos.MAX_ESPECIFICACIONES)
+def especificacion(id_grafico, huella, parametros, _construir):
+    construidos.add(id_grafico)
+    return graficos.especificacion(_construir(), id_grafico)
+
+def pintar(id_grafico, parametros, construir):
+    construidos.discard(id_grafico)
+    inicio = time.perf_counter()
+    try:
+        espec = especificacion(id_grafico, conjunto.huella, parametros, construir)
+    except ValueError as error:
+        st.error(str(error))
+        return
+    if PERF:
+        graficos_pintados.append({
+            "gráfico": id_grafico,
+            "ms": (time.perf_counter() - inicio) * 1000,
+            "filas": graficos.filas(espec),
+            "origen": "construido" if id_grafico in construidos else "caché",
+        })
+    st.vega_lite_chart(espec, use_container_width=True)
+
+# "completo" carga el dataset entero (snapshot o zip) y lo agrega en memoria;
+# "agregados" lee los zip por trozos y nunca materializa todas las filas
+MODO = os.environ.get("VENTAS_MODO", "completo")
+
+# Con VENTAS_PRECALCULADO=<carpeta> se cargan el cubo y el calendario que dejó en
+# esa carpeta precalcular.py, sin leer ni hashear los zip
+PRECALCULADO = os.environ.get("VENTAS_PRECALCULADO")
+
+# Cada RECARGA segundos se comprueba si han cambiado los zip (o los agregados
+# precalculados) y, si es así, el conjunto nuevo se construye en segundo plano y
+# sustituye al actual en todas las sesiones (ver recarga.py). Con 0 no hay hilo:
+# la firma se comprueba al principio de cada rerun y, si ha cambiado, el conjunto
+# se reconstruye en ese mismo rerun.
+RECARGA = float(os.environ.get("VENTAS_RECARGA", "30"))
+
+# cache_resource devuelve el mismo objeto a todas las sesiones y reruns (cache_data
+# devolvería una copia deserializada en cada llamada). En cada sesión solo viven
+# los valores de los filtros. El vigilante solo guarda funciones de carga.py y no
+# de este script, para no retener el espacio de nombres de la primera ejecución
+# (y con él la primera versión del conjunto) después de una recarga. Si la entrada
+# sale de la caché (st.cache_resource.clear(), otro modo...) su hilo se detiene.
+#
+# El cuerpo solo se ejecuta cuando la entrada no está en caché, así que `cargas`
+# indica si este rerun ha construido los datos (miss) o los ha encontrado (hit).
+cargas = []
+
+@st.cache_resource(show_spinner="Cargando datos...", max_entries=1, on_release=recarga.Vigilante.parar)
+def vigilante_datos(modo, precalculado):
+    cargas.append(modo)
+    return recarga.Vigilante(
+        functools.partial(carga.firma_origen, precalculado),
+        functools.partial(carga.construir_conjunto, modo, precalculado),
+        RECARGA,
+    )
+
+# Se ejecuta una vez por versión: al cambiar, vacía la caché de gráficos, cuyas
+# entradas de la versión anterior ya no se van a pedir
+@st.cache_resource(show_spinner=False, max_entries=1)
+def limpiar_graficos(version):
+    especificacion.clear()
+
+with cronometro(tiempos, "conjunto de datos"):
+    try:
+        vigilante = vigilante_datos(MODO, PRECALCULADO)
+    except (FileNotFoundError, ImportError) as error:
+        st.error(str(error))
+        st.stop()
+    if RECARGA == 0 and vigilante.comprobar():
+        cargas.append(MODO)
+vigente = vigilante.vigente
+conjunto = vigente.conjunto
+limpiar_graficos(vigente.numero)
+
+# La carga es un miss solo si este rerun ha construido el conjunto. Además, el
+# primer rerun de cada sesión con una versión nueva muestra los tiempos con los
+# que se construyó, aunque fuera en otra sesión o en segundo plano.
+version_nueva = st.session_state.get("version_datos") != vigente.numero
+st.session_state["version_datos"] = vigente.numero
+if version_nueva:
+    tiempos.update(vigente.tiempos)
+
+# Las sesiones que no interactúan se enteran de la versión nueva con este
+# fragmento, que comprueba periódicamente si ha cambiado y relanza la página
+if RECARGA > 0:
+    @st.fragment(run_every=RECARGA)
+    def comprobar_version():
+        if vigilante.actual is not conjunto:
+            st.rerun()
+
+    comprobar_version()
+
+if vigilante.error:
+    st.warning(f"No se han podido cargar los datos nuevos; se siguen mostrando los anteriores. {vigilante.error}")
+
+info = motor.info_dataset(conjunto)
 
 with st.expander("Información acerca del dataset analizado"):
-    st.write("Número de filas totales:", df.shape[0])
-    st.write("Numero de tiendas únicas:", df["store_nbr"].nunique())
-    st.write("Número de productos únicos:", df["family"].nunique())
-    st.write("Estados:", df["state"].nunique())
-    st.write("Años:", sorted(df["year"].unique()))
+    st.write("Número de filas totales:", info["filas"])
+    st.write("Numero de tiendas únicas:", info["tiendas"])
+    st.write("Número de productos únicos:", info["productos"])
+    st.write("Estados:", info["estados"])
+    st.write("Años:", info["años"])
+    origen = {
+        "cubo": "cubo agregado persistido",
+        "incremental": "cubo persistido más las partes nuevas",
+        "snapshot": "snapshot columnar",
+        "zip": "lectura de los zip",
+        "trozos": "lectura de los zip por trozos, solo agregados",
+        "duckdb (snapshot)": "consulta DuckDB sobre el snapshot columnar",
+        "duckdb (zip)": "consulta DuckDB sobre los zip",
+    }[vigente.origen]
+    st.write("Carga de datos:", f"{origen} (miss)" if cargas else "caché (hit)")
+    st.write("Versión de los datos:", vigente.numero)
+    st.write("Origen de la versión:", origen)
 
 st.title("Dashboard de Ventas")
 
-tab0, tab1, tab2, tab3, tab4 = st.tabs([
-    "Página de inicio",
-    "(P1) Visión global",
-    "(P2) Análisis por tienda",
-    "(P3) Análisis por estado",
-    "(P4) Insights avanzados"
-])
+# En lugar de st.tabs (que ejecuta el cuerpo de todas las pestañas en cada rerun)
+# se usa un selector y solo se ejecuta la vista activa. Los filtros llevan key y
+# se reasignan en cada rerun para que Streamlit no los olvide mientras su vista
+# no se está mostrando.
+FILTROS_PERSISTENTES = ["tipo_analisis", "tienda", "estado", "dimension_lift", "modo_pareto"]
+for clave in FILTROS_PERSISTENTES:
+    if clave in st.session_state:
+        st.session_state[clave] = st.session_state[clave]
+
+navegacion = st.container()
 
-with tab0:
+def pagina_inicio():
     st.header("Índice del dashboard")
 
     st.markdown("""
@@ -187,23 +345,18 @@ with tab0:
         " un resultado más profesional y completo"
     )
 
-with tab1:
-    st.header("Indicadores clave")
-
-    col1, col2, col3, col4 = st.columns(4)
-    meses_disponibles = df["date"].dt.to_period("M").nunique()
-
-    col1.metric("Tiendas", df["store_nbr"].nunique())
-    col2.metric("Productos", df["family"].nunique())
-    col3.metric("Estados", df["state"].nunique())
-    col4.metric("Meses", meses_disponibles)
-
+# Las secciones que dependen de un widget propio son fragmentos: al cambiar ese
+# widget solo se vuelve a ejecutar la sección, no el script completo.
+@st.fragment
+@medido("rankings")
+def seccion_rankings():
     st.markdown("**Escoger una métrica de análisis (Media de ventas/Ventas totales) para el apartado 1.b:**")
     tipo_analisis = st.radio(
         "",
         ["Media de ventas", "Ventas totales"],
         horizontal=True,
-        index=0
+        index=0,
+        key="tipo_analisis"
     )
     st.caption(
         "La vista por «media» cumple el análisis en términos medios solicitado en el enunciado. "
@@ -212,93 +365,74 @@ with tab1:
 
     st.subheader("Ranking (Top 10) de productos más vendidos")
 
-    if tipo_analisis == "Media de ventas":
-        top_productos = (
-            df.groupby("family", as_index=False)["sales"]
-            .mean()
-            .sort_values("sales", ascending=False)
-            .head(10)
-        )
-        y_title = "Ventas medias"
-    else:
-        top_productos = (
-            df.groupby("family", as_index=False)["sales"]
-            .sum()
-            .sort_values("sales", ascending=False)
-            .head(10)
-        )
-        y_title = "Ventas totales"
-
-    chart_top_prod = (
-        alt.Chart(top_productos)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("sales:Q", title=y_title),
-            y=alt.Y("family:N", sort="-x", title=None),
-            tooltip=[
-                alt.Tooltip("family:N", title="Producto"),
-                alt.Tooltip("sales:Q", title=y_title, format=",.2f")
-            ]
+    # Las dos variantes de cada ranking están precalculadas en el conjunto de
+    # datos; cambiar de métrica solo elige cuál se muestra.
+    variante = "mean" if tipo_analisis == "Media de ventas" else "sum"
+
+    top_productos = calcular(motor.top_productos, variante)
+    y_title = "Ventas medias" if variante == "mean" else "Ventas totales"
+
+    def chart_top_prod():
+        return (
+            alt.Chart(top_productos)
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("sales:Q", title=y_title),
+                y=alt.Y("family:N", sort="-x", title=None),
+                tooltip=[
+                    alt.Tooltip("family:N", title="Producto"),
+                    alt.Tooltip("sales:Q", title=y_title, format=",.2f")
+                ]
+            )
+            .properties(height=320)
         )
-        .properties(height=320)
-    )
-    st.altair_chart(chart_top_prod, use_container_width=True)
+    pintar("chart_top_prod", (variante,), chart_top_prod)
 
     st.divider()
 
     st.subheader("Distribución de ventas por tienda")
 
-    if tipo_analisis == "Media de ventas":
-        ventas_tienda = (
-            df.groupby("store_nbr", as_index=False)["sales"]
-            .mean()
-            .sort_values("sales", ascending=False)
-        )
-        y_title = "Ventas medias"
-    else:
-        ventas_tienda = (
-            df.groupby("store_nbr", as_index=False)["sales"]
-            .sum()
-            .sort_values("sales", ascending=False)
-        )
-        y_title = "Ventas totales"
-
-    ventas_tienda_plot = ventas_tienda.copy()
-
-    chart_tienda = (
-        alt.Chart(ventas_tienda_plot)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("store_nbr:O", title="Tienda"),
-            y=alt.Y("sales:Q", title=y_title),
-            tooltip=[
-                alt.Tooltip("store_nbr:O", title="Tienda"),
-                alt.Tooltip("sales:Q", title=y_title, format=",.2f")
-            ]
+    y_title = "Ventas medias" if variante == "mean" else "Ventas totales"
+    ventas_tiendas = calcular(motor.ventas_tiendas, variante)
+
+    def chart_tienda():
+        return (
+            alt.Chart(ventas_tiendas)
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("store_nbr:O", title="Tienda"),
+                y=alt.Y("sales:Q", title=y_title),
+                tooltip=[
+                    alt.Tooltip("store_nbr:O", title="Tienda"),
+                    alt.Tooltip("sales:Q", title=y_title, format=",.2f")
+                ]
+            )
+            .properties(height=320)
         )
-        .properties(height=320)
-    )
-    st.altair_chart(chart_tienda, use_container_width=True)
+    pintar("chart_tienda", (variante,), chart_tienda)
 
     st.subheader("Distribución (histograma) de ventas por tienda")
 
-    hist_df = ventas_tienda[["sales"]].copy()
-
-    chart_hist = (
-        alt.Chart(hist_df)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("sales:Q", bin=alt.Bin(maxbins=30), title=y_title),
-            y=alt.Y("count():Q", title="Número de tiendas"),
-            tooltip=[
-                alt.Tooltip("count():Q", title="Tiendas"),
-                alt.Tooltip("sales:Q", bin=True, title=y_title)
-            ]
+    histograma = calcular(motor.histograma_tiendas, variante)
+
+    def chart_hist():
+        return (
+            alt.Chart(histograma)
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("inicio:Q", bin="binned", title=y_title),
+                x2="fin:Q",
+                y=alt.Y("n:Q", title="Número de tiendas"),
+                tooltip=[
+                    alt.Tooltip("n:Q", title="Tiendas"),
+                    alt.Tooltip("inicio:Q", title="Desde", format=",.2f"),
+                    alt.Tooltip("fin:Q", title="Hasta", format=",.2f")
+                ]
+            )
+            .properties(height=280)
         )
-        .properties(height=280)
-    )
 
-    st.altair_chart(chart_hist, use_container_width=True)
+    pintar("chart_hist", (variante,), chart_hist)
     st.caption(
         "El gráfico superior compara tiendas. "
         "El histograma inferior representa la distribución estadística de ventas por tienda."
@@ -308,164 +442,144 @@ with tab1:
 
     st.subheader("Ranking (Top 10) de tiendas con ventas en promoción")
 
-    df_promo = df[df["onpromotion"] > 0]
+    promo_tiendas = calcular(motor.top_tiendas_promo, variante)
+    y_title = "Ventas medias (promo)" if variante == "mean" else "Ventas totales (promo)"
 
-    if tipo_analisis == "Media de ventas":
-        promo_tiendas = (
-            df_promo.groupby("store_nbr", as_index=False)["sales"]
-            .mean()
-            .sort_values("sales", ascending=False)
-            .head(10)
-        )
-        y_title = "Ventas medias (promo)"
-    else:
-        promo_tiendas = (
-            df_promo.groupby("store_nbr", as_index=False)["sales"]
-            .sum()
-            .sort_values("sales", ascending=False)
-            .head(10)
-        )
-        y_title = "Ventas totales (promo)"
-
-    chart_promo_tienda = (
-        alt.Chart(promo_tiendas)
-        .mark_bar(color=COLOR_PROMO)
-        .encode(
-            x=alt.X("sales:Q", title=y_title),
-            y=alt.Y("store_nbr:O", sort="-x", title=None),
-            tooltip=[
-                alt.Tooltip("store_nbr:O", title="Tienda"),
-                alt.Tooltip("sales:Q", title=y_title, format=",.2f")
-            ]
+    def chart_promo_tienda():
+        return (
+            alt.Chart(promo_tiendas)
+            .mark_bar(color=COLOR_PROMO)
+            .encode(
+                x=alt.X("sales:Q", title=y_title),
+                y=alt.Y("store_nbr:O", sort="-x", title=None),
+                tooltip=[
+                    alt.Tooltip("store_nbr:O", title="Tienda"),
+                    alt.Tooltip("sales:Q", title=y_title, format=",.2f")
+                ]
+            )
+            .properties(height=280)
         )
-        .properties(height=280)
-    )
-    st.altair_chart(chart_promo_tienda, use_container_width=True)
+    pintar("chart_promo_tienda", (variante,), chart_promo_tienda)
 
     st.divider()
 
+def pagina_global():
+    st.header("Indicadores clave")
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    col1.metric("Tiendas", info["tiendas"])
+    col2.metric("Productos", info["productos"])
+    col3.metric("Estados", info["estados"])
+    col4.metric("Meses", info["meses"])
+
+    seccion_rankings()
+
     st.subheader("Estacionalidad de las ventas")
 
-    orden_dias_en = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    orden_dias_es = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-    dias_presentes = set(df["day_of_week"].dropna().unique())
-    if set(orden_dias_es).issubset(dias_presentes):
-        orden_dias = orden_dias_es
-    else:
-        orden_dias = orden_dias_en
+    orden_dias = calcular(motor.orden_dias)
+    ventas_dia_df = calcular(motor.ventas_dia_semana)
 
-    ventas_dia_df = (
-        df.groupby("day_of_week", as_index=False)["sales"]
-        .mean()
-    )
-    media_global = ventas_dia_df["sales"].mean()
-
-    bars = (
-        alt.Chart(ventas_dia_df)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("day_of_week:N", sort=orden_dias, title="Día de la semana"),
-            y=alt.Y("sales:Q", title="Ventas medias"),
-            tooltip=[
-                alt.Tooltip("day_of_week:N", title="Día"),
-                alt.Tooltip("sales:Q", title="Ventas medias", format=",.2f")
-            ]
+    def chart_dias():
+        media_global = ventas_dia_df["sales"].mean()
+
+        bars = (
+            alt.Chart(ventas_dia_df)
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("day_of_week:N", sort=orden_dias, title="Día de la semana"),
+                y=alt.Y("sales:Q", title="Ventas medias"),
+                tooltip=[
+                    alt.Tooltip("day_of_week:N", title="Día"),
+                    alt.Tooltip("sales:Q", title="Ventas medias", format=",.2f")
+                ]
+            )
         )
-    )
-    ref_line = (
-        alt.Chart(pd.DataFrame({"media_global": [media_global]}))
-        .mark_rule(strokeDash=[6, 6], color=COLOR_REF)
-        .encode(y="media_global:Q")
-    )
-    chart_dias = (bars + ref_line).properties(height=300)
-    st.altair_chart(chart_dias, use_container_width=True)
+        ref_line = (
+            alt.Chart(pd.DataFrame({"media_global": [media_global]}))
+            .mark_rule(strokeDash=[6, 6], color=COLOR_REF)
+            .encode(y="media_global:Q")
+        )
+        return (bars + ref_line).properties(height=300)
+    pintar("chart_dias", (), chart_dias)
     st.caption("La línea discontinua representa la media global de ventas.")
 
     st.divider()
 
     st.subheader("Volumen de ventas medio por semana del año")
 
-    ventas_semana = (
-        df.groupby("week", as_index=False)["sales"]
-        .mean()
-        .sort_values("week")
-    )
-    chart_semana = (
-        alt.Chart(ventas_semana)
-        .mark_line(point=True, color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("week:O", title="Semana del año"),
-            y=alt.Y("sales:Q", title="Ventas medias"),
-            tooltip=[
-                alt.Tooltip("week:O", title="Semana"),
-                alt.Tooltip("sales:Q", title="Ventas medias", format=",.2f")
-            ]
+    ventas_semana = calcular(motor.ventas_semana)
+
+    def chart_semana():
+        return (
+            alt.Chart(ventas_semana)
+            .mark_line(point=True, color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("week:O", title="Semana del año"),
+                y=alt.Y("sales:Q", title="Ventas medias"),
+                tooltip=[
+                    alt.Tooltip("week:O", title="Semana"),
+                    alt.Tooltip("sales:Q", title="Ventas medias", format=",.2f")
+                ]
+            )
+            .properties(height=300)
         )
-        .properties(height=300)
-    )
-    st.altair_chart(chart_semana, use_container_width=True)
+    pintar("chart_semana", (), chart_semana)
 
     st.divider()
 
     st.subheader("Volumen de ventas medio por mes")
 
-    ventas_mes = (
-        df.groupby("month", as_index=False)["sales"]
-        .mean()
-        .sort_values("month")
-    )
-    chart_mes = (
-        alt.Chart(ventas_mes)
-        .mark_line(point=True, color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("month:O", title="Mes"),
-            y=alt.Y("sales:Q", title="Ventas medias"),
-            tooltip=[
-                alt.Tooltip("month:O", title="Mes"),
-                alt.Tooltip("sales:Q", title="Ventas medias", format=",.2f")
-            ]
+    ventas_mes = calcular(motor.ventas_mes)
+
+    def chart_mes():
+        return (
+            alt.Chart(ventas_mes)
+            .mark_line(point=True, color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("month:O", title="Mes"),
+                y=alt.Y("sales:Q", title="Ventas medias"),
+                tooltip=[
+                    alt.Tooltip("month:O", title="Mes"),
+                    alt.Tooltip("sales:Q", title="Ventas medias", format=",.2f")
+                ]
+            )
+            .properties(height=300)
         )
-        .properties(height=300)
-    )
-    st.altair_chart(chart_mes, use_container_width=True)
+    pintar("chart_mes", (), chart_mes)
 
-with tab2:
+def pagina_tienda():
     st.header("Análisis por Tienda")
 
     tienda_seleccionada = st.selectbox(
         "Selecciona una tienda del desplegable:",
-        sorted(df["store_nbr"].unique())
+        calcular(motor.tiendas),
+        key="tienda"
     )
 
-    df_tienda = df[df["store_nbr"] == tienda_seleccionada]
-
     st.subheader("Número total de ventas por año (de más antiguo a más reciente)")
-    ventas_anuales = (
-        df_tienda.groupby("year", as_index=False)["sales"]
-        .sum()
-        .sort_values("year")
-    )
+    ventas_anuales = calcular(motor.ventas_anuales_tienda, tienda_seleccionada)
 
-    chart_ventas_anual = (
-        alt.Chart(ventas_anuales)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("year:O", title="Año"),
-            y=alt.Y("sales:Q", title="Ventas totales"),
-            tooltip=[
-                alt.Tooltip("year:O", title="Año"),
-                alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
-            ]
+    def chart_ventas_anual():
+        return (
+            alt.Chart(ventas_anuales)
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("year:O", title="Año"),
+                y=alt.Y("sales:Q", title="Ventas totales"),
+                tooltip=[
+                    alt.Tooltip("year:O", title="Año"),
+                    alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
+                ]
+            )
+            .properties(height=320)
         )
-        .properties(height=320)
-    )
-    st.altair_chart(chart_ventas_anual, use_container_width=True)
+    pintar("chart_ventas_anual", (tienda_seleccionada,), chart_ventas_anual)
 
     st.divider()
 
     st.subheader("Número total de productos vendidos")
-    total_productos = int(round(df_tienda["sales"].sum()))
-    productos_promo = int(round(df_tienda[df_tienda["onpromotion"] > 0]["sales"].sum()))
+    total_productos, productos_promo = calcular(motor.unidades_tienda, tienda_seleccionada)
 
     c1, c2 = st.columns(2)
     c1.metric("Unidades vendidas", f"{total_productos:,}")
@@ -473,178 +587,214 @@ with tab2:
 
     st.subheader("Evolución mensual de ventas")
 
-    df_tienda_tmp = df_tienda.copy()
-    df_tienda_tmp["ym"] = df_tienda_tmp["date"].dt.to_period("M").astype(str)
+    ventas_mensuales = calcular(motor.ventas_mensuales_tienda, tienda_seleccionada)
+
+    def chart_tienda_mensual():
+        return (
+            alt.Chart(ventas_mensuales)
+            .mark_line(point=True, color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("ym:N", title="Mes"),
+                y=alt.Y("sales:Q", title="Ventas totales"),
+                tooltip=[
+                    alt.Tooltip("ym:N", title="Mes"),
+                    alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
+                ]
+            )
+            .properties(height=300)
+        )
+    pintar("chart_tienda_mensual", (tienda_seleccionada,), chart_tienda_mensual)
+    st.caption("Gráfico adicional para contextualizar la tendencia de la tienda.")
+
+@st.fragment
+@medido("producto más vendido")
+def seccion_producto_top(tiendas_estado, tienda_lider):
 
-    tienda_mensual = (
-        df_tienda_tmp.groupby("ym", as_index=False)["sales"]
-        .sum()
+    tienda_seleccionada_estado = st.selectbox(
+        "Selecciona una tienda dentro del estado:",
+        options=tiendas_estado,
+        index=tiendas_estado.index(tienda_lider)
     )
 
-    chart_tienda_mensual = (
-        alt.Chart(tienda_mensual)
-        .mark_line(point=True, color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("ym:N", title="Mes"),
-            y=alt.Y("sales:Q", title="Ventas totales"),
-            tooltip=[
-                alt.Tooltip("ym:N", title="Mes"),
-                alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
-            ]
+    productos = calcular(motor.productos_tienda, tienda_seleccionada_estado)
+    producto_top = productos["family"].iloc[0]
+
+    c1, c2 = st.columns(2)
+    c1.metric("Tienda seleccionada", int(tienda_seleccionada_estado))
+    c2.metric("Producto más vendido", producto_top)
+
+    st.subheader("Top 10 productos en la tienda seleccionada")
+
+    def chart_prod_tienda():
+        return (
+            alt.Chart(productos.head(motor.TOP))
+            .mark_bar(color=COLOR_PROMO)
+            .encode(
+                x=alt.X("sales:Q", title="Ventas totales"),
+                y=alt.Y("family:N", sort="-x", title=None),
+                tooltip=[
+                    alt.Tooltip("family:N", title="Producto"),
+                    alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
+                ]
+            )
+            .properties(height=320)
         )
-        .properties(height=300)
+
+    pintar("chart_prod_tienda", (tienda_seleccionada_estado,), chart_prod_tienda)
+    st.caption(
+        "Por defecto se muestra la tienda líder del estado, pero se puede seleccionar "
+        "cualquier otra tienda para analizar su producto más vendido."
     )
-    st.altair_chart(chart_tienda_mensual, use_container_width=True)
-    st.caption("Gráfico adicional para contextualizar la tendencia de la tienda.")
+    st.caption("Gráfico adicional para visualizar el Top 10 de productos dentro de la tienda seleccionada.")
 
-with tab3:
+def pagina_estado():
     st.header("Análisis por estado")
 
     estado_seleccionado = st.selectbox(
         "Selecciona un estado del desplegable:",
-        sorted(df["state"].dropna().unique())
+        calcular(motor.estados),
+        key="estado"
     )
 
-    df_estado = df[df["state"] == estado_seleccionado]
-
     st.subheader("Número total de transacciones por año")
-    transacciones_anuales = (
-        df_estado.groupby("year", as_index=False)["transactions"]
-        .sum()
-        .sort_values("year")
-    )
+    transacciones = calcular(motor.transacciones_anuales_estado, estado_seleccionado)
 
-    chart_trans = (
-        alt.Chart(transacciones_anuales)
-        .mark_bar(color=COLOR_TRANS)
-        .encode(
-            x=alt.X("year:O", title="Año"),
-            y=alt.Y("transactions:Q", title="Transacciones totales"),
-            tooltip=[
-                alt.Tooltip("year:O", title="Año"),
-                alt.Tooltip("transactions:Q", title="Transacciones", format=",.0f")
-            ]
+    def chart_trans():
+        return (
+            alt.Chart(transacciones)
+            .mark_bar(color=COLOR_TRANS)
+            .encode(
+                x=alt.X("year:O", title="Año"),
+                y=alt.Y("transactions:Q", title="Transacciones totales"),
+                tooltip=[
+                    alt.Tooltip("year:O", title="Año"),
+                    alt.Tooltip("transactions:Q", title="Transacciones", format=",.0f")
+                ]
+            )
+            .properties(height=320)
         )
-        .properties(height=320)
-    )
-    st.altair_chart(chart_trans, use_container_width=True)
+    pintar("chart_trans", (estado_seleccionado,), chart_trans)
 
     st.divider()
 
-    n_tiendas_estado = df_estado["store_nbr"].nunique()
-    st.subheader(f"Ranking de tiendas con más ventas (Top {min(10, n_tiendas_estado)})")
+    ventas_tiendas_estado = calcular(motor.ventas_tiendas_estado, estado_seleccionado)
+    st.subheader(f"Ranking de tiendas con más ventas (Top {min(motor.TOP, len(ventas_tiendas_estado))})")
 
-    ranking_tiendas = (
-        df_estado.groupby("store_nbr", as_index=False)["sales"]
-        .sum()
-        .sort_values("sales", ascending=False)
-        .head(10)
-    )
-
-    chart_rank = (
-        alt.Chart(ranking_tiendas)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("sales:Q", title="Ventas totales"),
-            y=alt.Y("store_nbr:O", sort="-x", title=None),
-            tooltip=[
-                alt.Tooltip("store_nbr:O", title="Tienda"),
-                alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
-            ]
+    def chart_rank():
+        return (
+            alt.Chart(ventas_tiendas_estado.head(motor.TOP))
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("sales:Q", title="Ventas totales"),
+                y=alt.Y("store_nbr:O", sort="-x", title=None),
+                tooltip=[
+                    alt.Tooltip("store_nbr:O", title="Tienda"),
+                    alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
+                ]
+            )
+            .properties(height=300)
         )
-        .properties(height=300)
-    )
-    st.altair_chart(chart_rank, use_container_width=True)
+    pintar("chart_rank", (estado_seleccionado,), chart_rank)
 
     st.divider()
 
     st.subheader("Producto más vendido en la tienda")
 
-    ventas_por_tienda_estado = (
-        df_estado.groupby("store_nbr")["sales"]
-        .sum()
-        .sort_values(ascending=False)
-    )
-
-    if ventas_por_tienda_estado.empty:
+    if ventas_tiendas_estado.empty:
         st.warning("No hay datos de ventas para este estado.")
     else:
-        tienda_lider = ventas_por_tienda_estado.index[0]
-        tiendas_estado = sorted(df_estado["store_nbr"].unique())
-
-        tienda_seleccionada_estado = st.selectbox(
-            "Selecciona una tienda dentro del estado:",
-            options=tiendas_estado,
-            index=tiendas_estado.index(tienda_lider)
+        seccion_producto_top(
+            sorted(ventas_tiendas_estado["store_nbr"]), ventas_tiendas_estado["store_nbr"].iloc[0]
         )
 
-        df_estado_tienda = df_estado[df_estado["store_nbr"] == tienda_seleccionada_estado]
+@st.fragment
+@medido("lift")
+def seccion_lift():
+    dimensiones_lift = {
+        "Estado": ("state", "estados"),
+        "Tienda": ("store_nbr", "tiendas"),
+        "Producto": ("family", "productos"),
+        "Mes": ("month", "meses"),
+    }
+    dimension_lift = st.selectbox(
+        "Analizar el lift de la promoción por:",
+        list(dimensiones_lift),
+        key="dimension_lift"
+    )
+    clave_lift, plural_lift = dimensiones_lift[dimension_lift]
 
-        producto_top = (
-            df_estado_tienda.groupby("family")["sales"]
-            .sum()
-            .sort_values(ascending=False)
-            .idxmax()
+    st.markdown(f"**Top 10 {plural_lift} con mayor lift de promoción**")
+
+    top_lift = calcular(motor.top_lift, clave_lift)
+
+    def chart_lift_estado():
+        return (
+            alt.Chart(top_lift)
+            .mark_bar(color=COLOR_VENTAS)
+            .encode(
+                x=alt.X("lift:Q", title="Lift con promoción vs sin promoción"),
+                y=alt.Y(f"{clave_lift}:N", sort="-x", title=None),
+                tooltip=[
+                    alt.Tooltip(f"{clave_lift}:N", title=dimension_lift),
+                    alt.Tooltip("lift:Q", title="Lift", format=",.2%")
+                ]
+            )
+            .properties(height=300)
         )
+    pintar("chart_lift_estado", (dimension_lift,), chart_lift_estado)
 
-        c1, c2 = st.columns(2)
-        c1.metric("Tienda seleccionada", int(tienda_seleccionada_estado))
-        c2.metric("Producto más vendido", producto_top)
+@st.fragment
+@medido("concentración")
+def seccion_concentracion():
+    st.subheader("Concentración de ventas")
 
-        st.subheader("Top 10 productos en la tienda seleccionada")
+    modo_pareto = st.radio(
+        "Elegir por qué analizar la concentración:",
+        ["Tiendas", "Productos"],
+        horizontal=True,
+        key="modo_pareto"
+    )
 
-        top10_prod_tienda = (
-            df_estado_tienda.groupby("family", as_index=False)["sales"]
-            .sum()
-            .sort_values("sales", ascending=False)
-            .head(10)
-        )
+    etiqueta = "store_nbr" if modo_pareto == "Tiendas" else "family"
+    pareto_plot, n80 = calcular(motor.concentracion, etiqueta)
+    st.metric(f"Nº de {modo_pareto.lower()} para llegar al 80% de ventas", n80)
 
-        chart_prod_tienda = (
-            alt.Chart(top10_prod_tienda)
-            .mark_bar(color=COLOR_PROMO)
+    def chart_pareto():
+        return (
+            alt.Chart(pareto_plot)
+            .mark_line(point=True, color=COLOR_ESTADO)
             .encode(
-                x=alt.X("sales:Q", title="Ventas totales"),
-                y=alt.Y("family:N", sort="-x", title=None),
+                x=alt.X("rank:O", title=f"Ranking (Top 50) de {modo_pareto.lower()}"),
+                y=alt.Y("pct_acum:Q", title="% acumulado de ventas"),
                 tooltip=[
-                    alt.Tooltip("family:N", title="Producto"),
-                    alt.Tooltip("sales:Q", title="Ventas", format=",.0f")
+                    alt.Tooltip("rank:O", title="Rank"),
+                    alt.Tooltip(etiqueta + ":N", title=modo_pareto[:-1]),
+                    alt.Tooltip("pct_acum:Q", title="% acumulado", format=",.2f")
                 ]
             )
-            .properties(height=320)
+            .properties(height=300)
         )
+    pintar("chart_pareto", (modo_pareto,), chart_pareto)
+    st.caption(
+        "Ayuda a entender si las ventas están concentradas en pocos elementos o están más repartidas. "
+        "Se utiliza la regla de Pareto (80/20). Por legibilidad se limita la visualización al Top 50."
+    )
 
-        st.altair_chart(chart_prod_tienda, use_container_width=True)
-        st.caption(
-            "Por defecto se muestra la tienda líder del estado, pero se puede seleccionar "
-            "cualquier otra tienda para analizar su producto más vendido."
-        )
-        st.caption("Gráfico adicional para visualizar el Top 10 de productos dentro de la tienda seleccionada.")
-
-with tab4:
+def pagina_avanzada():
     st.header("Información avanzada")
     st.info("Análisis adicional para ayudar en la toma de decisiones y conclusiones")
 
     st.subheader("Resumen")
 
-    ventas_dia = df.groupby("day_of_week")["sales"].mean()
-    mejor_dia = ventas_dia.idxmax()
-
-    ventas_mes = df.groupby("month")["sales"].mean()
-    mejor_mes = int(ventas_mes.idxmax())
-
-    ventas_estado = df.groupby("state")["sales"].sum().sort_values(ascending=False)
-    estado_top = ventas_estado.index[0]
-    pct_estado_top = ventas_estado.iloc[0] / ventas_estado.sum() * 100 if ventas_estado.sum() != 0 else 0
+    resumen = calcular(motor.resumen_avanzado)
+    mejor_dia = resumen["mejor_dia"]
+    mejor_mes = resumen["mejor_mes"]
+    estado_top = resumen["estado_top"]
+    pct_estado_top = resumen["pct_estado_top"]
 
-    df_tmp = df.copy()
-    df_tmp["promo"] = df_tmp["onpromotion"] > 0
-    ventas_total = df_tmp["sales"].sum()
-    ventas_promo_total = df_tmp[df_tmp["promo"]]["sales"].sum()
-    share_promo = ventas_promo_total / ventas_total * 100 if ventas_total != 0 else 0
-
-    total_trans = df["transactions"].sum()
-    ticket_global = df["sales"].sum() / total_trans if total_trans != 0 else 0
+    promo_global = resumen["promociones"]
+    share_promo = promo_global["cuota_promo"]
+    ticket_global = promo_global["ticket"]
 
     c1, c2, c3, c4, c5 = st.columns(5)
     c1.metric("Mejor día (media)", str(mejor_dia))
@@ -663,90 +813,58 @@ with tab4:
 
     st.subheader("Impacto, contribución y dónde funcionan mejor las promociones")
 
-    media_promo = df_tmp[df_tmp["promo"]]["sales"].mean()
-    media_no = df_tmp[~df_tmp["promo"]]["sales"].mean()
-    lift = (media_promo / media_no) - 1 if media_no != 0 else 0
+    media_promo = promo_global["promo"]
+    media_no = promo_global["no_promo"]
+    lift = promo_global["lift"]
 
-    c1, c2, c3, c4 = st.columns(4)
+    c1, c2, c3, c4, c5 = st.columns(5)
     c1.metric("Media ventas con promoción", f"{media_promo:,.2f}")
     c2.metric("Media ventas sin promoción", f"{media_no:,.2f}")
     c3.metric("Lift de la promoción", f"{lift*100:,.1f}%")
     c4.metric("Ventas en promoción / total", f"{share_promo:,.1f}%")
+    c5.metric("Ticket medio (ventas / transacción)", f"{ticket_global:,.2f}")
 
-    promo_vs_no = (
-        df_tmp.groupby("promo", as_index=False)["sales"]
-        .mean()
-        .rename(columns={"sales": "ventas_medias"})
-    )
-    chart_promo = (
-        alt.Chart(promo_vs_no)
-        .mark_bar(color=COLOR_PROMO)
-        .encode(
-            x=alt.X("promo:N", title="¿Están en promoción?"),
-            y=alt.Y("ventas_medias:Q", title="Ventas medias"),
-            tooltip=[
-                alt.Tooltip("promo:N", title="Promo"),
-                alt.Tooltip("ventas_medias:Q", title="Ventas medias", format=",.2f")
-            ]
-        )
-        .properties(height=260)
-    )
-    st.altair_chart(chart_promo, use_container_width=True)
-
-    st.markdown("**Top 10 estados con mayor lift de promoción**")
+    ventas_promo = calcular(motor.ventas_promo)
 
-    lift_estado = (
-        df_tmp.groupby(["state", "promo"])["sales"].mean().reset_index()
-        .pivot(index="state", columns="promo", values="sales")
-        .rename(columns={False: "no_promo", True: "promo"})
-    )
-    lift_estado = lift_estado.fillna(0)
-    lift_estado["lift"] = lift_estado.apply(
-        lambda x: (x["promo"] / x["no_promo"]) - 1 if x["no_promo"] != 0 else 0,
-        axis=1
-    )
-    lift_estado = lift_estado.sort_values("lift", ascending=False).head(10).reset_index()
-
-    chart_lift_estado = (
-        alt.Chart(lift_estado)
-        .mark_bar(color=COLOR_VENTAS)
-        .encode(
-            x=alt.X("lift:Q", title="Lift con promoción vs sin promoción"),
-            y=alt.Y("state:N", sort="-x", title=None),
-            tooltip=[
-                alt.Tooltip("state:N", title="Estado"),
-                alt.Tooltip("lift:Q", title="Lift", format=",.2%")
-            ]
+    def chart_promo():
+        return (
+            alt.Chart(ventas_promo)
+            .mark_bar(color=COLOR_PROMO)
+            .encode(
+                x=alt.X("promo:N", title="¿Están en promoción?"),
+                y=alt.Y("ventas_medias:Q", title="Ventas medias"),
+                tooltip=[
+                    alt.Tooltip("promo:N", title="Promo"),
+                    alt.Tooltip("ventas_medias:Q", title="Ventas medias", format=",.2f")
+                ]
+            )
+            .properties(height=260)
         )
-        .properties(height=300)
-    )
-    st.altair_chart(chart_lift_estado, use_container_width=True)
+    pintar("chart_promo", (), chart_promo)
+
+    seccion_lift()
 
     st.divider()
 
     st.subheader("Impacto en ventas (media) de los festivos")
 
-    ventas_festivo = (
-        df.groupby("holiday_type", as_index=False)["sales"]
-        .mean()
-        .rename(columns={"sales": "ventas_medias"})
-        .sort_values("ventas_medias", ascending=False)
-    )
+    ventas_festivos = calcular(motor.ventas_festivos)
 
-    chart_festivo = (
-        alt.Chart(ventas_festivo)
-        .mark_bar(color=COLOR_FEST)
-        .encode(
-            x=alt.X("holiday_type:N", sort="-y", title="Tipo de festivo"),
-            y=alt.Y("ventas_medias:Q", title="Ventas medias"),
-            tooltip=[
-                alt.Tooltip("holiday_type:N", title="Festivo"),
-                alt.Tooltip("ventas_medias:Q", title="Ventas medias", format=",.2f")
-            ]
+    def chart_festivo():
+        return (
+            alt.Chart(ventas_festivos)
+            .mark_bar(color=COLOR_FEST)
+            .encode(
+                x=alt.X("holiday_type:N", sort="-y", title="Tipo de festivo"),
+                y=alt.Y("ventas_medias:Q", title="Ventas medias"),
+                tooltip=[
+                    alt.Tooltip("holiday_type:N", title="Festivo"),
+                    alt.Tooltip("ventas_medias:Q", title="Ventas medias", format=",.2f")
+                ]
+            )
+            .properties(height=320)
         )
-        .properties(height=320)
-    )
-    st.altair_chart(chart_festivo, use_container_width=True)
+    pintar("chart_festivo", (), chart_festivo)
     st.caption(
         "Este gráfico permite identificar qué tipos de festivo están asociados con un mayor nivel de ventas medias."
     )
@@ -755,86 +873,70 @@ with tab4:
 
     st.subheader("Crecimiento interanual")
 
-    ventas_anio = (
-        df.groupby("year", as_index=False)["sales"]
-        .sum()
-        .rename(columns={"sales": "ventas_totales"})
-        .sort_values("year")
-    )
-    ventas_anio["yoy_pct"] = ventas_anio["ventas_totales"].pct_change() * 100
+    ventas_anio = calcular(motor.crecimiento_anual)
 
     c1, c2 = st.columns(2)
     if len(ventas_anio) >= 2:
         ultimo = ventas_anio.iloc[-1]
-        anterior = ventas_anio.iloc[-2]
         c1.metric("Ventas último año", f"{ultimo['ventas_totales']:,.0f}")
         c2.metric(
             "Crecimiento interanual último año",
-            f"{(ultimo['ventas_totales']/anterior['ventas_totales']-1)*100:,.1f}%"
+            f"{ultimo['yoy_pct']:,.1f}%"
         )
     else:
         c1.metric("Ventas", f"{ventas_anio['ventas_totales'].sum():,.0f}")
         c2.metric("Crecimiento interanual", "N/A")
 
-    chart_yoy = (
-        alt.Chart(ventas_anio)
-        .mark_line(point=True, color=COLOR_TRANS)
-        .encode(
-            x=alt.X("year:O", title="Año"),
-            y=alt.Y("ventas_totales:Q", title="Ventas totales"),
-            tooltip=[
-                alt.Tooltip("year:O", title="Año"),
-                alt.Tooltip("ventas_totales:Q", title="Ventas", format=",.0f"),
-                alt.Tooltip("yoy_pct:Q", title="YoY %", format=",.2f")
-            ]
+    def chart_yoy():
+        return (
+            alt.Chart(ventas_anio)
+            .mark_line(point=True, color=COLOR_TRANS)
+            .encode(
+                x=alt.X("year:O", title="Año"),
+                y=alt.Y("ventas_totales:Q", title="Ventas totales"),
+                tooltip=[
+                    alt.Tooltip("year:O", title="Año"),
+                    alt.Tooltip("ventas_totales:Q", title="Ventas", format=",.0f"),
+                    alt.Tooltip("yoy_pct:Q", title="YoY %", format=",.2f")
+                ]
+            )
+            .properties(height=300)
         )
-        .properties(height=300)
-    )
-    st.altair_chart(chart_yoy, use_container_width=True)
+    pintar("chart_yoy", (), chart_yoy)
 
     st.divider()
 
-    st.subheader("Concentración de ventas")
+    seccion_concentracion()
 
-    modo_pareto = st.radio(
-        "Elegir por qué analizar la concentración:",
-        ["Tiendas", "Productos"],
-        horizontal=True
-    )
+PAGINAS = {
+    "Página de inicio": pagina_inicio,
+    "(P1) Visión global": pagina_global,
+    "(P2) Análisis por tienda": pagina_tienda,
+    "(P3) Análisis por estado": pagina_estado,
+    "(P4) Insights avanzados": pagina_avanzada,
+}
 
-    if modo_pareto == "Tiendas":
-        serie = df.groupby("store_nbr")["sales"].sum().sort_values(ascending=False)
-        etiqueta = "store_nbr"
-    else:
-        serie = df.groupby("family")["sales"].sum().sort_values(ascending=False)
-        etiqueta = "family"
+with navegacion:
+    pagina = st.radio(
+        "Sección del dashboard",
+        list(PAGINAS),
+        horizontal=True,
+        key="pagina",
+        label_visibility="collapsed"
+    )
 
-    pareto = serie.reset_index()
-    pareto.columns = [etiqueta, "ventas"]
-    total = pareto["ventas"].sum()
-    pareto["pct_acum"] = pareto["ventas"].cumsum() / total * 100 if total != 0 else 0
-    pareto["rank"] = range(1, len(pareto) + 1)
+# El panel del rerun completo se reserva antes de la vista para que quede encima
+# de los de sus fragmentos, que se pintan mientras se ejecuta
+panel = st.sidebar.container() if PERF else None
 
-    n80 = int((pareto["pct_acum"] <= 80).sum())
-    st.metric(f"Nº de {modo_pareto.lower()} para llegar al 80% de ventas", n80)
+with cronometro(tiempos, f"vista: {pagina}"):
+    PAGINAS[pagina]()
 
-    pareto_plot = pareto.head(50)
-    chart_pareto = (
-        alt.Chart(pareto_plot)
-        .mark_line(point=True, color=COLOR_ESTADO)
-        .encode(
-            x=alt.X("rank:O", title=f"Ranking (Top 50) de {modo_pareto.lower()}"),
-            y=alt.Y("pct_acum:Q", title="% acumulado de ventas"),
-            tooltip=[
-                alt.Tooltip("rank:O", title="Rank"),
-                alt.Tooltip(etiqueta + ":N", title=modo_pareto[:-1]),
-                alt.Tooltip("pct_acum:Q", title="% acumulado", format=",.2f")
-            ]
+if PERF:
+    with panel:
+        panel_rendimiento("Rendimiento de este rerun", tiempos, graficos_pintados, f"vista: {pagina}")
+        st.caption(
+            "«conjunto de datos» incluye la carga completa solo si no estaba en caché. Los pasos «carga: …» "
+            "son los de la versión de datos actual y solo aparecen en el primer rerun que la usa."
         )
-        .properties(height=300)
-    )
-    st.altair_chart(chart_pareto, use_container_width=True)
-    st.caption(
-        "Ayuda a entender si las ventas están concentradas en pocos elementos o están más repartidas. "
-        "Se utiliza la regla de Pareto (80/20). Por legibilidad se limita la visualización al Top 50."
-    )
+
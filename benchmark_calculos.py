@@ -0,0 +1,132 @@
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+import pyarrow as pa
+
+import agregados
+import datos
+import generar_datos
+import kpis
+from agregados import resumir
+
+# Micro-benchmarks de cada cálculo del dashboard a distintas escalas de datos
+# sintéticos (ver generar_datos.py). De cada paso se mide el tiempo (mínimo y
+# mediana de varias repeticiones) y, en una ejecución aparte con tracemalloc, el
+# pico de memoria reservada por Python/NumPy y la memoria de Arrow que queda viva.
+#
+#   python benchmark_calculos.py --escalas 1M,10M,50M --json bench.json
+DIRECTORIO = "datos_bench"
+
+
+def medir(preparar, ejecutar, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        entrada = preparar()
+        inicio = time.perf_counter()
+        ejecutar(entrada)
+        tiempos.append(time.perf_counter() - inicio)
+
+    entrada = preparar()
+    arrow_antes = pa.total_allocated_bytes()
+    tracemalloc.start()
+    resultado = ejecutar(entrada)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow = pa.total_allocated_bytes() - arrow_antes
+    del resultado
+
+    return {
+        "min_s": min(tiempos),
+        "mediana_s": statistics.median(tiempos),
+        "pico_mb": pico / 2**20,
+        "arrow_mb": arrow / 2**20,
+    }
+
+
+def rutas_escala(escala, directorio=DIRECTORIO):
+    carpeta = os.path.join(directorio, escala)
+    rutas = datos.descubrir_partes(carpeta)
+    if not rutas:
+        rutas = generar_datos.generar(generar_datos.leer_filas(escala), carpeta)
+    return rutas
+
+
+# Pasos en el orden en que se ejecutan al arrancar y al navegar por el dashboard:
+# nombre -> (preparar, ejecutar). preparar() no se cronometra y devuelve una
+# entrada nueva cada vez, porque la limpieza y la derivación modifican el frame.
+def pasos(rutas, base):
+    cubo, calendario = base["cubo"], base["calendario"]
+    tabla = {
+        "carga (pyarrow)": (lambda: rutas, lambda r: datos.cargar_datos(r, "pyarrow")),
+        "carga (c)": (lambda: rutas, lambda r: datos.cargar_datos(r, "c")),
+        "limpieza": (lambda: base["crudo"].copy(), datos.limpiar_datos),
+        "columnas derivadas": (lambda: base["limpio"].copy(), datos.derivar_columnas),
+        "dimensión de fechas": (lambda: base["derivado"].copy(), datos.separar_fechas),
+        "cubo y calendario": (lambda: base["derivado"], agregados.agregar),
+        "cubo (dimensión)": (lambda: base["separado"], lambda e: agregados.agregar(*e)),
+        "agregados por trozos": (lambda: rutas, lambda r: agregados.agregar_por_trozos(r, motor="pandas")),
+        "rankings (todos)": (lambda: cubo, agregados.precalcular_rankings),
+    }
+    # Con duckdb instalado, la construcción del cubo con VENTAS_MOTOR=duckdb
+    # partiendo de la tabla Arrow de los zip, para compararla con la de pandas
+    # (carga, limpieza, derivadas y cubo)
+    if importlib.util.find_spec("duckdb") is not None:
+        tabla["cubo (duckdb)"] = (lambda: datos.cargar_tabla(rutas), agregados.agregar_duckdb)
+        tabla["trozos (duckdb)"] = (lambda: rutas, lambda r: agregados.agregar_por_trozos(r, motor="duckdb"))
+    for nombre, (clave, solo_promo) in agregados.RANKINGS.items():
+        tabla[f"ranking {nombre}"] = (
+            lambda s=solo_promo: cubo[cubo["promo"]] if s else cubo,
+            lambda origen, c=clave: resumir(origen, c, estadistico="mean").sort_values("sales", ascending=False),
+        )
+    tabla.update({
+        "estacionalidad día": (lambda: calendario, lambda c: resumir(c, "day_of_week", estadistico="mean")),
+        "estacionalidad semana": (lambda: calendario, lambda c: resumir(c, "week", estadistico="mean")),
+        "estacionalidad mes": (lambda: cubo, lambda c: resumir(c, "month", estadistico="mean")),
+        "lift global": (lambda: cubo, kpis.promociones),
+    })
+    for clave in ["state", "store_nbr", "family", "month"]:
+        tabla[f"lift por {clave}"] = (lambda: cubo, lambda c, k=clave: kpis.promociones(c, k))
+    tabla["yoy"] = (lambda: cubo, kpis.yoy)
+    for clave in agregados.CLAVES_PARETO:
+        tabla[f"pareto {clave}"] = (lambda: cubo, lambda c, k=clave: kpis.pareto(c, k))
+    return tabla
+
+
+def ejecutar_escala(escala, repeticiones, directorio=DIRECTORIO):
+    rutas = rutas_escala(escala, directorio)
+    base = {"crudo": datos.cargar_datos(rutas)}
+    base["limpio"] = datos.limpiar_datos(base["crudo"].copy())
+    base["derivado"] = datos.derivar_columnas(base["limpio"].copy())
+    base["cubo"], base["calendario"] = agregados.agregar(base["derivado"])
+    base["separado"] = datos.separar_fechas(base["derivado"].copy())
+
+    resultados = {}
+    for nombre, (preparar, ejecutar) in pasos(rutas, base).items():
+        resultados[nombre] = medir(preparar, ejecutar, repeticiones)
+        r = resultados[nombre]
+        print(
+            f"{escala:>5} {nombre:<24} {r['min_s']:9.4f} s {r['mediana_s']:9.4f} s "
+            f"{r['pico_mb']:9.1f} MB {r['arrow_mb']:9.1f} MB",
+            flush=True,
+        )
+    return {"filas": len(base["crudo"]), "celdas_cubo": len(base["cubo"]), "pasos": resultados}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de los cálculos del dashboard")
+    parser.add_argument("--escalas", default="1M", help="escalas separadas por comas, p. ej. 1M,10M,50M")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--directorio", default=DIRECTORIO)
+    parser.add_argument("--json", help="ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    print(f"{'':>5} {'paso':<24} {'mínimo':>11} {'mediana':>11} {'pico py':>12} {'arrow':>12}")
+    informe = {escala: ejecutar_escala(escala, args.repeticiones, args.directorio) for escala in args.escalas.split(",")}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(informe, f, indent=2)
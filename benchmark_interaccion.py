@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from rendimiento import medir
+
+# Latencia extremo a extremo de cada interacción del dashboard, ejecutándolo sin
+# navegador con la API de testing de Streamlit. Recorre un guion fijo (primera
+# carga, conmutador media/total, todas las tiendas de P2, todos los estados de P3
+# y los dos modos de Pareto), mide el tiempo de cada rerun y el pico de memoria
+# residente del proceso mientras dura, y guarda un informe JSON con p50/p95/max
+# por tipo de interacción.
+#
+#   python benchmark_interaccion.py --datos datos_bench/10M --json latencias.json
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def guion(at, vueltas):
+    yield "primera carga", lambda: at.run()
+    for _ in range(vueltas):
+        yield "navegación", lambda: at.radio(key="pagina").set_value("(P1) Visión global").run()
+        for valor in ["Ventas totales", "Media de ventas"]:
+            yield "tipo_analisis", lambda v=valor: at.radio(key="tipo_analisis").set_value(v).run()
+
+        yield "navegación", lambda: at.radio(key="pagina").set_value("(P2) Análisis por tienda").run()
+        for i in range(len(at.selectbox(key="tienda").options)):
+            yield "tienda", lambda i=i: at.selectbox(key="tienda").select_index(i).run()
+
+        yield "navegación", lambda: at.radio(key="pagina").set_value("(P3) Análisis por estado").run()
+        for i in range(len(at.selectbox(key="estado").options)):
+            yield "estado", lambda i=i: at.selectbox(key="estado").select_index(i).run()
+
+        yield "navegación", lambda: at.radio(key="pagina").set_value("(P4) Insights avanzados").run()
+        for valor in ["Productos", "Tiendas"]:
+            yield "modo_pareto", lambda v=valor: at.radio(key="modo_pareto").set_value(v).run()
+
+
+def resumen(muestras):
+    tiempos = np.array([m["ms"] for m in muestras])
+    return {
+        "n": len(muestras),
+        "p50_ms": float(np.percentile(tiempos, 50)),
+        "p95_ms": float(np.percentile(tiempos, 95)),
+        "max_ms": float(tiempos.max()),
+        "pico_rss_mb": max(m["pico_rss_mb"] for m in muestras),
+    }
+
+
+def ejecutar(vueltas=2, timeout=300):
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    muestras = []
+    for interaccion, accion in guion(at, vueltas):
+        _, segundos, pico = medir(accion)
+        if at.exception:
+            raise RuntimeError(f"{interaccion}: {at.exception[0].message}")
+        muestras.append({"interaccion": interaccion, "ms": segundos * 1000, "pico_rss_mb": pico / 2**20})
+
+    tipos = dict.fromkeys(m["interaccion"] for m in muestras)
+    return {
+        "interacciones": {tipo: resumen([m for m in muestras if m["interaccion"] == tipo]) for tipo in tipos},
+        "muestras": muestras,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia por interacción del dashboard con AppTest")
+    parser.add_argument("--datos", default=".", help="carpeta con los parte_N.csv.zip")
+    parser.add_argument("--vueltas", type=int, default=2, help="veces que se repite el guion tras la primera carga")
+    parser.add_argument("--timeout", type=float, default=300, help="segundos máximos por rerun")
+    parser.add_argument("--json", default="latencias.json")
+    args = parser.parse_args()
+
+    ruta_json = os.path.abspath(args.json)
+    os.chdir(args.datos)
+    informe = ejecutar(args.vueltas, args.timeout)
+    with open(ruta_json, "w") as f:
+        json.dump(informe, f, indent=2)
+
+    print(f"{'interacción':<15} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'pico MB':>9}")
+    for tipo, r in informe["interacciones"].items():
+        print(f"{tipo:<15} {r['n']:>4} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['max_ms']:9.1f} {r['pico_rss_mb']:9.1f}")
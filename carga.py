@@ -0,0 +1,115 @@
+import os
+
+import agregados
+import datos
+import recarga
+from rendimiento import cronometro
+
+# Construcción del conjunto de datos que sirve el dashboard, sin Streamlit: la
+# usan la primera carga del servidor, la recarga en segundo plano de recarga.py
+# y precalcular.py. Los tiempos de cada paso se acumulan en `tiempos` y el origen
+# de los datos (cubo persistido, snapshot, zip...) se anota en estado["origen"].
+# Con snapshot_filas=False no se lee ni se escribe el snapshot de filas.
+
+
+# Devuelve el frame de filas y la dimensión de fechas (ver datos.separar_fechas())
+def cargar_datos_limpios(huella, tiempos, estado, snapshot_filas=True):
+    if snapshot_filas:
+        with cronometro(tiempos, "carga: snapshot"):
+            df = datos.cargar_snapshot(huella)
+            fechas = datos.cargar_snapshot(huella, datos.RUTA_FECHAS)
+        if df is not None and fechas is not None:
+            estado["origen"] = "snapshot"
+            return df, fechas
+
+    estado["origen"] = "zip"
+    with cronometro(tiempos, "carga: cargar_datos()"):
+        df = datos.cargar_datos([archivo[0] for archivo in huella])
+    with cronometro(tiempos, "carga: limpieza"):
+        df = datos.limpiar_datos(df)
+    with cronometro(tiempos, "carga: derivadas"):
+        df, fechas = datos.separar_fechas(datos.derivar_columnas(df))
+    if snapshot_filas:
+        with cronometro(tiempos, "carga: guardar snapshot"):
+            datos.guardar_snapshot(df, huella)
+            datos.guardar_snapshot(fechas, huella, datos.RUTA_FECHAS)
+    return df, fechas
+
+
+# Con DuckDB no se construye el frame de filas: la consulta lee el snapshot si
+# es válido y, si no, los zip leídos como tablas Arrow
+def agregar_duckdb(huella, tiempos, estado, snapshot_filas=True):
+    tabla = fechas = None
+    if snapshot_filas:
+        with cronometro(tiempos, "carga: snapshot"):
+            tabla = datos.tabla_snapshot(huella)
+            fechas = datos.cargar_snapshot(huella, datos.RUTA_FECHAS)
+    if tabla is not None and fechas is not None:
+        estado["origen"] = "duckdb (snapshot)"
+    else:
+        estado["origen"] = "duckdb (zip)"
+        fechas = None
+        with cronometro(tiempos, "carga: cargar_tabla()"):
+            tabla = datos.cargar_tabla([archivo[0] for archivo in huella])
+    with cronometro(tiempos, "carga: cubo con duckdb"):
+        return agregados.agregar_duckdb(tabla, fechas)
+
+
+def construir_agregados(huella, modo, directorio, tiempos, estado, snapshot_filas=True):
+    with cronometro(tiempos, "carga: cubo persistido"):
+        persistidos = agregados.cargar(huella, directorio)
+    if persistidos is not None:
+        estado["origen"] = "cubo"
+        return persistidos
+
+    with cronometro(tiempos, "carga: partes nuevas"):
+        actualizados = agregados.actualizar(huella, directorio, modo)
+    if actualizados is not None:
+        estado["origen"] = "incremental"
+        cubo, calendario = actualizados
+    elif modo == "agregados":
+        estado["origen"] = "trozos"
+        with cronometro(tiempos, "carga: agregados por trozos"):
+            cubo, calendario = agregados.agregar_por_trozos([archivo[0] for archivo in huella])
+    elif agregados.MOTOR == "duckdb":
+        cubo, calendario = agregar_duckdb(huella, tiempos, estado, snapshot_filas)
+    else:
+        df, fechas = cargar_datos_limpios(huella, tiempos, estado, snapshot_filas)
+        with cronometro(tiempos, "carga: cubo"):
+            cubo, calendario = agregados.agregar(df, fechas)
+    with cronometro(tiempos, "carga: guardar cubo"):
+        agregados.guardar(cubo, calendario, huella, directorio)
+    return cubo, calendario
+
+
+# Con `precalculado` (una carpeta de precalcular.py) solo se cargan sus agregados,
+# sin leer ni hashear los zip y sin escribir nada en la carpeta. Si el cubo y el
+# calendario no tienen la misma huella (por ejemplo, precalcular.py está a mitad
+# de sustituirlos) no se publica ninguna versión: la recarga conserva la actual y
+# lo vuelve a intentar cuando se escriba el segundo fichero. Sin `precalculado`,
+# los parte_N.csv.zip del directorio actual.
+def construir_conjunto(modo, precalculado, tiempos, estado):
+    if precalculado:
+        huella = agregados.huella_guardada(precalculado)
+        with cronometro(tiempos, "carga: cubo persistido"):
+            persistidos = agregados.cargar(huella, precalculado) if huella is not None else None
+        if persistidos is None:
+            raise FileNotFoundError(f"No hay agregados precalculados válidos en {precalculado}. Ejecuta precalcular.py.")
+        estado["origen"] = "cubo"
+        return agregados.ConjuntoDatos(huella, *persistidos)
+
+    partes = datos.descubrir_partes()
+    if not partes:
+        raise FileNotFoundError(
+            f"No se ha encontrado ningún fichero {datos.PATRON_PARTES} en el directorio de la aplicación."
+        )
+    with cronometro(tiempos, "huella de los zip"):
+        huella = datos.huella_archivos(partes)
+    cubo, calendario = construir_agregados(huella, modo, ".", tiempos, estado)
+    return agregados.ConjuntoDatos(huella, cubo, calendario)
+
+
+def firma_origen(precalculado):
+    if precalculado:
+        return recarga.firma([os.path.join(precalculado, ruta) for ruta in [agregados.RUTA_CUBO, agregados.RUTA_CALENDARIO]])
+    return recarga.firma(datos.descubrir_partes())
@@ -0,0 +1,350 @@
+import glob
+import hashlib
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.feather as feather
+
+# Los datos llegan en extractos parte_N.csv.zip; se usan todos los que haya en
+# el directorio, ordenados por N
+PATRON_PARTES = "parte_*.csv.zip"
+RUTA_SNAPSHOT = "ventas.arrow"
+RUTA_FECHAS = "ventas_fechas.arrow"
+
+# Esquema declarado que se aplica al leer los CSV. Solo se cargan las columnas
+# que usan las pestañas; las medidas pueden leerse en float32 con VENTAS_FLOAT32=1.
+FLOAT32 = os.environ.get("VENTAS_FLOAT32", "0") == "1"
+
+COLUMNAS_TEXTO = ["family", "state", "day_of_week", "holiday_type"]
+TIPOS_ENTEROS = {"store_nbr": "int16", "year": "int16", "month": "int8", "week": "int8"}
+MEDIDAS = ["sales", "transactions", "onpromotion"]
+COLUMNAS = ["date"] + list(TIPOS_ENTEROS) + COLUMNAS_TEXTO + MEDIDAS
+
+# Las columnas de texto se leen sin valores nulos: un trozo del parser con todo
+# vacío produciría categorías float incompatibles con las del resto. Los textos
+# nulos se convierten en NaN después, al limpiar las categorías.
+NULOS = ["", "NA", "N/A", "NaN", "nan", "NULL", "null", "None"]
+
+# "pyarrow" usa el lector CSV multihilo de Arrow; "c" el parser por defecto de pandas
+LECTOR = os.environ.get("VENTAS_LECTOR", "pyarrow")
+
+VERSION_ESQUEMA = "9-float32" if FLOAT32 else "9-float64"
+
+# Formato de la columna date en los CSV. El lector c la lee como categoría y solo
+# convierte las fechas distintas (unas 1.700) con este formato, en lugar de
+# inferirlo fila a fila; el lector de Arrow ya la convierte con su parser ISO 8601.
+FORMATO_FECHA = "%Y-%m-%d"
+
+
+def esquema(float32=FLOAT32):
+    tipos = {col: "category" for col in COLUMNAS_TEXTO}
+    tipos.update(TIPOS_ENTEROS)
+    tipos.update({col: "float32" if float32 else "float64" for col in MEDIDAS})
+    return tipos
+
+
+def esquema_arrow(float32=FLOAT32):
+    tipos = {"date": pa.timestamp("us")}
+    tipos.update({col: pa.dictionary(pa.int32(), pa.string()) for col in COLUMNAS_TEXTO})
+    tipos.update({col: pa.from_numpy_dtype(np.dtype(tipo)) for col, tipo in TIPOS_ENTEROS.items()})
+    tipos.update({col: pa.float32() if float32 else pa.float64() for col in MEDIDAS})
+    return tipos
+
+
+def _numero_parte(ruta):
+    numero = os.path.basename(ruta)[len("parte_"):-len(".csv.zip")]
+    return (int(numero) if numero.isdigit() else float("inf"), ruta)
+
+
+def descubrir_partes(directorio="."):
+    rutas = [os.path.normpath(ruta) for ruta in glob.glob(os.path.join(directorio, PATRON_PARTES))]
+    return sorted(rutas, key=_numero_parte)
+
+
+def hash_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+# Huella de los zip de origen: (ruta, tamaño, mtime, sha256) de cada uno
+def huella_archivos(rutas=None):
+    rutas = descubrir_partes() if rutas is None else rutas
+    huella = []
+    for ruta in rutas:
+        info = os.stat(ruta)
+        huella.append((ruta, info.st_size, info.st_mtime_ns, hash_archivo(ruta)))
+    return tuple(huella)
+
+
+def nombre_csv(z):
+    return [n for n in z.namelist() if n.endswith(".csv") and "__MACOSX" not in n][0]
+
+
+def opciones_arrow():
+    return pv.ConvertOptions(
+        include_columns=COLUMNAS,
+        column_types=esquema_arrow(),
+        null_values=NULOS,
+        strings_can_be_null=False,
+    )
+
+
+def leer_csv_arrow(fuente):
+    return pv.read_csv(fuente, read_options=pv.ReadOptions(use_threads=True), convert_options=opciones_arrow())
+
+
+def leer_zip_arrow(ruta):
+    with zipfile.ZipFile(ruta, "r") as z:
+        return leer_csv_arrow(z.open(nombre_csv(z)))
+
+
+# Lectura en streaming con Arrow: los lotes del lector se juntan en tablas de
+# unas `filas` filas, así que en memoria nunca hay más de un trozo de la parte
+def leer_zip_arrow_por_trozos(ruta, filas):
+    with zipfile.ZipFile(ruta, "r") as z:
+        lotes, n = [], 0
+        for lote in pv.open_csv(z.open(nombre_csv(z)), convert_options=opciones_arrow()):
+            lotes.append(lote)
+            n += lote.num_rows
+            if n >= filas:
+                yield pa.Table.from_batches(lotes)
+                lotes, n = [], 0
+        if lotes:
+            yield pa.Table.from_batches(lotes)
+
+
+def opciones_lectura():
+    return {
+        "usecols": COLUMNAS,
+        "dtype": {**esquema(), "date": "category"},
+        "keep_default_na": False,
+        "na_values": {col: NULOS for col in COLUMNAS if col not in COLUMNAS_TEXTO},
+    }
+
+
+def parsear_fechas(serie):
+    fechas = np.append(pd.to_datetime(serie.cat.categories, format=FORMATO_FECHA).to_numpy(), np.datetime64("NaT"))
+    return pd.Series(fechas[serie.cat.codes.to_numpy()], index=serie.index, name=serie.name)
+
+
+def leer_zip(ruta):
+    with zipfile.ZipFile(ruta, "r") as z:
+        df = pd.read_csv(z.open(nombre_csv(z)), **opciones_lectura())
+    df["date"] = parsear_fechas(df["date"])
+    return df
+
+
+def leer_zip_por_trozos(ruta, filas):
+    with zipfile.ZipFile(ruta, "r") as z:
+        with pd.read_csv(z.open(nombre_csv(z)), chunksize=filas, **opciones_lectura()) as lector:
+            for trozo in lector:
+                trozo["date"] = parsear_fechas(trozo["date"])
+                yield trozo
+
+
+# pd.concat convierte a object las categóricas con categorías distintas, así que
+# antes se igualan las categorías de todas las partes.
+def unir_partes(partes):
+    for col in COLUMNAS_TEXTO:
+        categorias = partes[0][col].cat.categories
+        for parte in partes[1:]:
+            categorias = categorias.union(parte[col].cat.categories)
+        for parte in partes:
+            parte[col] = parte[col].cat.set_categories(categorias)
+    return pd.concat(partes, ignore_index=True)
+
+
+# Las partes se descomprimen y se parsean en paralelo. Con Arrow las tablas se
+# concatenan sin copiar (solo se encadenan los trozos) y se convierten a pandas
+# una única vez.
+def cargar_datos(rutas=None, lector=LECTOR):
+    rutas = descubrir_partes() if rutas is None else rutas
+    if lector == "pyarrow":
+        return cargar_tabla(rutas).to_pandas(split_blocks=True)
+    with ThreadPoolExecutor(max_workers=min(len(rutas), os.cpu_count() or 1)) as pool:
+        partes = list(pool.map(leer_zip, rutas))
+    return unir_partes(partes)
+
+
+def cargar_tabla(rutas=None):
+    rutas = descubrir_partes() if rutas is None else rutas
+    with ThreadPoolExecutor(max_workers=min(len(rutas), os.cpu_count() or 1)) as pool:
+        return pa.concat_tables(list(pool.map(leer_zip_arrow, rutas)))
+
+
+# Se limpian las categorías (decenas de valores) en lugar de cada fila. Si al
+# quitar espacios dos categorías coinciden, sus códigos se fusionan. Las
+# categorías quedan ordenadas para que los groupby no dependan del lector.
+def limpiar_categorias(serie):
+    limpias = serie.cat.categories.astype(str).str.strip()
+    unicas = limpias[~limpias.isin(NULOS)].unique().sort_values()
+    mapa = np.append(unicas.get_indexer(limpias), -1)
+    codigos = mapa[serie.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=unicas), index=serie.index, name=serie.name)
+
+
+def rellenar_medidas(df):
+    df["sales"] = df["sales"].fillna(0)
+    df["transactions"] = df["transactions"].fillna(0)
+    df["onpromotion"] = df["onpromotion"].fillna(0)
+    return df
+
+
+def limpiar_textos(df):
+    for col in COLUMNAS_TEXTO:
+        df[col] = limpiar_categorias(df[col])
+    return df
+
+
+def limpiar_datos(df):
+    return limpiar_textos(rellenar_medidas(df))
+
+
+# Columnas derivadas que se calculan una vez al cargar y quedan en el snapshot,
+# para que la construcción del cubo no tenga que copiar el frame para añadirlas:
+# - promo: la fila tiene artículos en promoción
+# - dia: código entero de la fecha (días desde 1970-01-01), la clave de la
+#   dimensión de fechas. Las filas sin fecha no pueden compartir un código, porque
+#   sus año, mes, semana y día de la semana pueden ser distintos: reciben códigos
+#   negativos, uno por cada combinación de esos atributos.
+def derivar_columnas(df):
+    df["promo"] = df["onpromotion"] > 0
+    fechas = df["date"].to_numpy().astype("datetime64[D]")
+    dia = fechas.astype("int64")
+    sin_fecha = np.isnat(fechas)
+    if sin_fecha.any():
+        combinaciones = df.loc[sin_fecha, COLUMNAS_FECHA].groupby(COLUMNAS_FECHA, observed=True, dropna=False)
+        dia[sin_fecha] = -1 - combinaciones.ngroup().to_numpy()
+    df["dia"] = dia.astype("int32")
+    return df
+
+
+# Atributos de calendario de cada fecha. En los CSV se repiten en todas las filas
+# aunque solo hay unas 1.700 fechas distintas, así que tras derivar "dia" se pasan
+# a una dimensión de fechas (una fila por día, con el código de día) y se quitan
+# del frame de filas. Quien los necesite los recupera por código de día con
+# columna_fecha(), sin guardarlos en el frame.
+COLUMNAS_FECHA = ["year", "month", "week", "day_of_week"]
+
+
+def separar_fechas(df):
+    dia = df["dia"].to_numpy()
+    inicio = int(dia.min())
+    fila = np.full(int(dia.max()) - inicio + 1, -1, dtype=np.int64)
+    fila[dia - inicio] = np.arange(len(dia))
+    fechas = df[["dia"] + COLUMNAS_FECHA].take(fila[fila >= 0]).reset_index(drop=True)
+    for col in COLUMNAS_FECHA:
+        del df[col]
+    return df, fechas
+
+
+def columna_fecha(df, fechas, columna):
+    dias = fechas["dia"].to_numpy()
+    inicio = int(dias.min())
+    posicion = np.full(int(dias.max()) - inicio + 1, -1, dtype=np.int64)
+    posicion[dias - inicio] = np.arange(len(dias))
+    return fechas[columna].take(posicion[df["dia"].to_numpy() - inicio]).set_axis(df.index)
+
+
+# Orden físico del cubo (ver agregados.py): las celdas de cada estado, y dentro
+# de él las de cada tienda, quedan contiguas. Así seleccionar una tienda o un
+# estado es un corte por posición (una vista, sin copia) en lugar de un filtro
+# booleano sobre todas las celdas. Si los datos no lo permiten (una tienda con
+# filas en dos estados, o con el estado vacío) el corte de ese valor es el array
+# de sus posiciones.
+COLUMNAS_CORTE = ["state", "store_nbr"]
+
+
+def ordenar_datos(df, claves):
+    return df.sort_values(claves, kind="stable", ignore_index=True)
+
+
+def indice_cortes(df, columna):
+    codigos, etiquetas = pd.factorize(df[columna])
+    orden = np.argsort(codigos, kind="stable")
+    grupos = np.arange(len(etiquetas))
+    inicios = np.searchsorted(codigos[orden], grupos, side="left")
+    fines = np.searchsorted(codigos[orden], grupos, side="right")
+    cortes = {}
+    for valor, inicio, fin in zip(etiquetas.tolist(), inicios, fines):
+        posiciones = orden[inicio:fin]
+        if posiciones[-1] - posiciones[0] + 1 == len(posiciones):
+            cortes[valor] = slice(int(posiciones[0]), int(posiciones[-1]) + 1)
+        else:
+            cortes[valor] = posiciones
+    return cortes
+
+
+def cortar(df, cortes, valor):
+    return df.iloc[cortes.get(valor, slice(0, 0))]
+
+
+# El snapshot es un fichero Arrow IPC (Feather v2) sin comprimir, de forma que
+# se puede mapear en memoria: solo se leen del disco las páginas que se usan (por
+# ejemplo, las de las columnas que consulta DuckDB sobre tabla_snapshot()).
+# La huella de los zip de origen se guarda en los metadatos del esquema.
+def guardar_snapshot(df, huella, ruta=RUTA_SNAPSHOT, version=VERSION_ESQUEMA):
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[b"huella"] = json.dumps(huella).encode()
+    metadatos[b"esquema"] = version.encode()
+    tabla = tabla.replace_schema_metadata(metadatos)
+
+    tmp = ruta + ".tmp"
+    feather.write_feather(tabla, tmp, compression="uncompressed")
+    os.replace(tmp, ruta)
+
+
+# Para validar el snapshot solo cuenta el contenido de los zip (ruta, tamaño y
+# hash), no su fecha de modificación.
+def _contenido(huella):
+    return [[ruta, tamano, hash_] for ruta, tamano, _, hash_ in huella]
+
+
+def _metadatos(ruta):
+    with pa.memory_map(ruta) as fuente:
+        return pa.ipc.open_file(fuente).schema.metadata or {}
+
+
+def huella_snapshot(ruta=RUTA_SNAPSHOT, version=VERSION_ESQUEMA):
+    if not os.path.exists(ruta):
+        return None
+    metadatos = _metadatos(ruta)
+    if b"huella" not in metadatos or metadatos.get(b"esquema") != version.encode():
+        return None
+    return json.loads(metadatos[b"huella"])
+
+
+# Rutas de las partes de huella que no estaban en la huella guardada. Devuelve
+# None si alguna parte guardada ha cambiado o ya no está: entonces no basta con
+# añadir las nuevas y hay que recalcular todo.
+def partes_nuevas(guardada, huella):
+    anteriores = _contenido(guardada)
+    actuales = _contenido(huella)
+    if any(parte not in actuales for parte in anteriores):
+        return None
+    return [parte[0] for parte in actuales if parte not in anteriores]
+
+
+# El snapshot como tabla Arrow mapeada en memoria, sin pasar a pandas
+def tabla_snapshot(huella, ruta=RUTA_SNAPSHOT, version=VERSION_ESQUEMA):
+    guardada = huella_snapshot(ruta, version)
+    if guardada is None or _contenido(guardada) != _contenido(huella):
+        return None
+    return feather.read_table(ruta, memory_map=True)
+
+
+def cargar_snapshot(huella, ruta=RUTA_SNAPSHOT, version=VERSION_ESQUEMA):
+    tabla = tabla_snapshot(huella, ruta, version)
+    if tabla is None:
+        return None
+    return tabla.to_pandas(split_blocks=True)
@@ -0,0 +1,162 @@
+import argparse
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+# Generador de datos sintéticos con el mismo esquema y formato que
+# parte_1.csv.zip / parte_2.csv.zip, para medir el dashboard a distintas escalas.
+# Familias, estados y tipos de festivo son los del dataset original y el rango
+# de fechas también; con más filas lo que crece es el número de tiendas.
+#
+#   python generar_datos.py --filas 10M --salida datos_bench/10M
+COLUMNAS = [
+    "date", "store_nbr", "family", "sales", "onpromotion", "transactions",
+    "state", "holiday_type", "year", "month", "week", "day_of_week",
+]
+
+# Ordenadas de más a menos vendida: el peso de cada familia sigue una ley de Zipf
+FAMILIAS = [
+    "GROCERY I", "BEVERAGES", "PRODUCE", "CLEANING", "DAIRY", "BREAD/BAKERY",
+    "POULTRY", "MEATS", "PERSONAL CARE", "DELI", "HOME CARE", "EGGS",
+    "FROZEN FOODS", "PREPARED FOODS", "LIQUOR,WINE,BEER", "SEAFOOD",
+    "GROCERY II", "HOME AND KITCHEN I", "HOME AND KITCHEN II", "SCHOOL AND OFFICE SUPPLIES",
+    "LAWN AND GARDEN", "PET SUPPLIES", "CELEBRATION", "PLAYERS AND ELECTRONICS",
+    "LADIESWEAR", "AUTOMOTIVE", "LINGERIE", "MAGAZINES", "HARDWARE",
+    "HOME APPLIANCES", "BEAUTY", "BABY CARE", "BOOKS",
+]
+
+# Estados con la proporción aproximada de tiendas de cada uno
+ESTADOS = {
+    "Pichincha": 0.35, "Guayas": 0.20, "Azuay": 0.05, "Manabi": 0.05,
+    "Santo Domingo de los Tsachilas": 0.05, "Cotopaxi": 0.04, "Tungurahua": 0.04,
+    "Los Rios": 0.04, "El Oro": 0.04, "Chimborazo": 0.02, "Imbabura": 0.02,
+    "Bolivar": 0.02, "Pastaza": 0.02, "Santa Elena": 0.02, "Loja": 0.02, "Esmeraldas": 0.02,
+}
+
+# Tipo de festivo de un día y su probabilidad; el resto de días queda vacío
+FESTIVOS = {"Holiday": 0.05, "Event": 0.025, "Additional": 0.02, "Transfer": 0.005, "Bridge": 0.002, "Work Day": 0.003}
+
+FECHA_INICIO = "2013-01-01"
+FECHA_FIN = "2017-08-15"
+FILAS_BLOQUE = 1_000_000
+
+FACTOR_DIA = np.array([0.95, 0.90, 0.92, 0.85, 0.97, 1.15, 1.26])
+FACTOR_MES = np.array([0.90, 0.88, 0.95, 0.95, 0.98, 0.97, 1.00, 1.00, 0.98, 1.00, 1.05, 1.35])
+
+
+def leer_filas(texto):
+    texto = str(texto).upper().replace("_", "")
+    multiplicador = {"K": 1_000, "M": 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip("KM")) * multiplicador)
+
+
+def dimensiones(filas, rng):
+    fechas = pd.date_range(FECHA_INICIO, FECHA_FIN, freq="D")
+    n_tiendas = max(1, int(np.ceil(filas / (len(fechas) * len(FAMILIAS)))))
+    estados = list(ESTADOS)
+    probabilidades = np.array(list(ESTADOS.values()))
+    festivos = np.array([""] + list(FESTIVOS), dtype=object)
+    prob_festivos = np.array([1 - sum(FESTIVOS.values())] + list(FESTIVOS.values()))
+    return {
+        "fechas": fechas,
+        "texto_fechas": fechas.strftime("%Y-%m-%d").to_numpy(),
+        "semanas": fechas.isocalendar().week.to_numpy().astype(np.int8),
+        "nombres_dia": fechas.day_name().to_numpy(),
+        "festivos": rng.choice(festivos, len(fechas), p=prob_festivos),
+        "tendencia": 1.05 ** ((fechas - fechas[0]).days.to_numpy() / 365),
+        "estado_tienda": rng.choice(estados, n_tiendas, p=probabilidades / probabilidades.sum()),
+        "peso_tienda": rng.lognormal(0, 0.6, n_tiendas),
+        "peso_familia": 1000 / np.arange(1, len(FAMILIAS) + 1) ** 1.2,
+        "ceros_familia": np.linspace(0.02, 0.6, len(FAMILIAS)),
+        "promo_familia": np.linspace(0.35, 0.05, len(FAMILIAS)),
+    }
+
+
+# Filas [inicio, fin) de la rejilla fecha x tienda x familia, en el orden del CSV
+# original. Cada bloque usa su propia semilla, así que el resultado no depende de
+# en cuántas partes se reparta.
+def bloque(dim, inicio, fin, semilla):
+    rng = np.random.default_rng([semilla, inicio])
+    familias = len(FAMILIAS)
+    n_tiendas = len(dim["peso_tienda"])
+    fila = np.arange(inicio, fin)
+    dia = fila // (n_tiendas * familias)
+    tienda = fila // familias % n_tiendas
+    familia = fila % familias
+    fechas = dim["fechas"]
+    n = len(fila)
+
+    promo = rng.random(n) < dim["promo_familia"][familia]
+    onpromotion = np.where(promo, rng.poisson(5, n) + 1, 0)
+    base = (
+        dim["peso_familia"][familia] * dim["peso_tienda"][tienda] * dim["tendencia"][dia]
+        * FACTOR_DIA[fechas.dayofweek.to_numpy()[dia]] * FACTOR_MES[fechas.month.to_numpy()[dia] - 1]
+    )
+    ventas = base * np.where(promo, 1.3, 1.0) * rng.gamma(2.0, 0.5, n)
+    ventas = np.where(rng.random(n) < dim["ceros_familia"][familia], 0, ventas.round(3))
+    ventas[rng.random(n) < 0.001] = np.nan
+
+    transacciones_dia = np.round(dim["peso_tienda"][tienda] * 1500 * FACTOR_DIA[fechas.dayofweek.to_numpy()[dia]])
+    transacciones = np.where(rng.random(n) < 0.02, np.nan, transacciones_dia + rng.integers(-50, 50, n))
+
+    return pd.DataFrame({
+        "date": dim["texto_fechas"][dia],
+        "store_nbr": tienda + 1,
+        "family": np.array(FAMILIAS, dtype=object)[familia],
+        "sales": ventas,
+        "onpromotion": onpromotion,
+        "transactions": transacciones,
+        "state": dim["estado_tienda"][tienda],
+        "holiday_type": dim["festivos"][dia],
+        "year": fechas.year.to_numpy()[dia],
+        "month": fechas.month.to_numpy()[dia],
+        "week": dim["semanas"][dia],
+        "day_of_week": dim["nombres_dia"][dia],
+    }, columns=COLUMNAS)
+
+
+def bloques(filas, semilla=0, filas_bloque=FILAS_BLOQUE):
+    dim = dimensiones(filas, np.random.default_rng(semilla))
+    for inicio in range(0, filas, filas_bloque):
+        yield bloque(dim, inicio, min(inicio + filas_bloque, filas), semilla)
+
+
+# Reparte las filas en partes consecutivas (por fecha, como el original) y
+# escribe cada una en un zip con un único CSV, bloque a bloque y con el escritor
+# CSV de Arrow, sin tener todo el dataset en memoria.
+def generar(filas, directorio=".", partes=2, semilla=0):
+    os.makedirs(directorio, exist_ok=True)
+    por_parte = np.diff(np.linspace(0, filas, partes + 1).astype(int))
+    fuente = bloques(filas, semilla)
+    pendiente = next(fuente)
+    opciones = pv.WriteOptions(include_header=False, quoting_style="needed")
+    rutas = []
+    for numero, n in enumerate(por_parte, start=1):
+        ruta = os.path.join(directorio, f"parte_{numero}.csv.zip")
+        with zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED) as z:
+            with z.open(f"parte_{numero}.csv", "w", force_zip64=True) as f:
+                f.write((",".join(COLUMNAS) + "\n").encode())
+                while n > 0:
+                    if pendiente.empty:
+                        pendiente = next(fuente)
+                    trozo, pendiente = pendiente.iloc[:n], pendiente.iloc[n:]
+                    pv.write_csv(pa.Table.from_pandas(trozo, preserve_index=False), f, opciones)
+                    n -= len(trozo)
+        rutas.append(ruta)
+    return rutas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera zips de ventas sintéticos con el esquema del dashboard")
+    parser.add_argument("--filas", default="1M", help="número de filas (admite 1M, 10M, 50M...)")
+    parser.add_argument("--partes", type=int, default=2)
+    parser.add_argument("--salida", default=".")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    for ruta in generar(leer_filas(args.filas), args.salida, args.partes, args.semilla):
+        print(ruta, f"{os.path.getsize(ruta) / 2**20:,.1f} MB")
@@ -0,0 +1,87 @@
+import os
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+# Preparación de los datos que se envían a los gráficos de Altair. Todo lo que
+# sea agregar o agrupar en intervalos se hace aquí, en el servidor, y ningún
+# gráfico puede incrustar en la página más de MAX_FILAS filas: según la política
+# se muestrean filas equiespaciadas ("muestrear") o se rechaza el gráfico ("error").
+MAX_FILAS = int(os.environ.get("VENTAS_MAX_FILAS_GRAFICO", "5000"))
+POLITICA = os.environ.get("VENTAS_POLITICA_FILAS", "muestrear")
+
+# Número máximo de especificaciones de gráfico guardadas en caché; al superarlo
+# se descartan las usadas hace más tiempo.
+MAX_ESPECIFICACIONES = int(os.environ.get("VENTAS_MAX_GRAFICOS_CACHE", "256"))
+
+
+def limitar(df, max_filas=MAX_FILAS, politica=POLITICA):
+    if len(df) <= max_filas:
+        return df
+    if politica == "error":
+        raise ValueError(
+            f"El gráfico recibiría {len(df):,} filas y el máximo es {max_filas:,}. "
+            "Agrega los datos antes de pintarlos."
+        )
+    posiciones = np.unique(np.linspace(0, len(df) - 1, max_filas).round().astype(int))
+    return df.iloc[posiciones]
+
+
+def filas(espec):
+    return sum(len(conjunto) for conjunto in espec.get("datasets", {}).values())
+
+
+def limitar_grafico(grafico, max_filas=MAX_FILAS, politica=POLITICA):
+    grafico = grafico.copy(deep=False)
+    if isinstance(grafico.data, pd.DataFrame):
+        grafico.data = limitar(grafico.data, max_filas, politica)
+    if isinstance(grafico, alt.LayerChart):
+        grafico.layer = [limitar_grafico(capa, max_filas, politica) for capa in grafico.layer]
+    return grafico
+
+
+def _separar_datos(grafico, nombre, conjuntos):
+    grafico = grafico.copy(deep=False)
+    if isinstance(grafico.data, pd.DataFrame):
+        clave = f"{nombre}-{len(conjuntos)}"
+        conjuntos[clave] = grafico.data
+        grafico.data = alt.NamedData(name=clave)
+    if isinstance(grafico, alt.LayerChart):
+        grafico.layer = [_separar_datos(capa, nombre, conjuntos) for capa in grafico.layer]
+    return grafico
+
+
+# Especificación Vega-Lite lista para st.vega_lite_chart. Los DataFrames van en
+# "datasets" tal cual (Streamlit los envía en Arrow) y el resto del gráfico se
+# valida y se serializa aquí una sola vez, de modo que la especificación se puede
+# guardar en caché y reutilizar en los reruns en que no cambian sus filtros.
+def especificacion(grafico, nombre="datos", max_filas=MAX_FILAS, politica=POLITICA):
+    conjuntos = {}
+    espec = _separar_datos(limitar_grafico(grafico, max_filas, politica), nombre, conjuntos).to_dict()
+    espec["datasets"] = conjuntos
+    return espec
+
+
+# Paso "redondo" (1, 2 o 5 por una potencia de 10) que no genera más de maxbins
+# intervalos, como hace Vega-Lite con alt.Bin(maxbins=...).
+def _paso(rango, maxbins):
+    if rango <= 0:
+        return 1.0
+    paso_minimo = rango / maxbins
+    base = 10 ** np.floor(np.log10(paso_minimo))
+    for multiplo in (1, 2, 5, 10):
+        if base * multiplo >= paso_minimo:
+            return float(base * multiplo)
+
+
+def histograma(valores, maxbins=30):
+    valores = pd.Series(valores).dropna().to_numpy()
+    if len(valores) == 0:
+        return pd.DataFrame({"inicio": [], "fin": [], "n": []})
+    paso = _paso(valores.max() - valores.min(), maxbins)
+    inicio = np.floor(valores.min() / paso) * paso
+    fin = (np.floor(valores.max() / paso) + 1) * paso
+    bordes = np.arange(inicio, fin + paso / 2, paso)
+    n, bordes = np.histogram(valores, bins=bordes)
+    return pd.DataFrame({"inicio": bordes[:-1], "fin": bordes[1:], "n": n})
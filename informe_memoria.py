@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import tracemalloc
+import zipfile
+
+import pyarrow as pa
+
+import datos
+import rendimiento
+
+# Informe de memoria de la ingesta, etapa por etapa, para dimensionar los
+# contenedores. De cada etapa se guarda el tiempo, el pico de memoria reservada
+# por Python/NumPy durante la etapa (tracemalloc), lo que queda retenido al
+# terminar (Python/NumPy y Arrow por separado) y la memoria residente del
+# proceso; al final, el uso de memoria de cada columna del frame limpio.
+#
+# Con el lector pyarrow la descompresión y el parseo se miden por separado
+# (el CSV descomprimido se lee primero a memoria); con el lector c van juntos
+# porque pandas parsea mientras descomprime.
+#
+#   python informe_memoria.py --lector pyarrow --json memoria_ingesta.json
+
+
+def _descomprimir(rutas):
+    contenidos = []
+    for ruta in rutas:
+        with zipfile.ZipFile(ruta, "r") as z:
+            contenidos.append(z.read(datos.nombre_csv(z)))
+    return contenidos
+
+
+def _parsear(estado):
+    contenidos = estado.pop("contenidos")
+    return [datos.leer_csv_arrow(pa.BufferReader(contenido)) for contenido in contenidos]
+
+
+def etapas(rutas, lector):
+    if lector == "pyarrow":
+        return [
+            ("descompresión", "contenidos", lambda e: _descomprimir(rutas)),
+            ("parseo", "tablas", _parsear),
+            ("concat", "tabla", lambda e: pa.concat_tables(e.pop("tablas"))),
+            ("to_pandas", "df", lambda e: e.pop("tabla").to_pandas(split_blocks=True)),
+        ] + ETAPAS_LIMPIEZA
+    return [
+        ("descompresión y parseo", "partes", lambda e: [datos.leer_zip(ruta) for ruta in rutas]),
+        ("concat", "df", lambda e: datos.unir_partes(e.pop("partes"))),
+    ] + ETAPAS_LIMPIEZA
+
+
+def _separar_fechas(estado):
+    df, estado["fechas"] = datos.separar_fechas(estado.pop("df"))
+    return df
+
+
+ETAPAS_LIMPIEZA = [
+    ("fillna", "df", lambda e: datos.rellenar_medidas(e["df"])),
+    ("strip de textos", "df", lambda e: datos.limpiar_textos(e["df"])),
+    ("columnas derivadas", "df", lambda e: datos.derivar_columnas(e["df"])),
+    ("dimensión de fechas", "df", _separar_fechas),
+]
+
+
+def _mb(n):
+    return round(n / 2**20, 2)
+
+
+def ingesta(rutas=None, lector=datos.LECTOR):
+    rutas = datos.descubrir_partes() if rutas is None else rutas
+    tracemalloc.start()
+    estado = {}
+    informe = {"lector": lector, "archivos": {ruta: os.path.getsize(ruta) for ruta in rutas}, "etapas": []}
+    try:
+        for nombre, destino, accion in etapas(rutas, lector):
+            python_antes, _ = tracemalloc.get_traced_memory()
+            arrow_antes = pa.total_allocated_bytes()
+            tracemalloc.reset_peak()
+            resultado, segundos, rss_pico = rendimiento.medir(lambda: accion(estado))
+            estado[destino] = resultado
+            python_despues, python_pico = tracemalloc.get_traced_memory()
+            informe["etapas"].append({
+                "etapa": nombre,
+                "segundos": round(segundos, 4),
+                "pico_mb": _mb(python_pico - python_antes),
+                "retenido_mb": _mb(python_despues - python_antes),
+                "arrow_retenido_mb": _mb(pa.total_allocated_bytes() - arrow_antes),
+                "rss_pico_mb": _mb(rss_pico),
+                "rss_mb": _mb(rendimiento.rss()),
+            })
+    finally:
+        tracemalloc.stop()
+
+    df = estado["df"]
+    uso = df.memory_usage(deep=True, index=False)
+    informe["filas"] = len(df)
+    informe["columnas"] = {col: {"dtype": str(df[col].dtype), "mb": _mb(uso[col])} for col in df.columns}
+    informe["total_mb"] = _mb(uso.sum())
+    informe["fechas"] = {"filas": len(estado["fechas"]), "mb": _mb(estado["fechas"].memory_usage(deep=True).sum())}
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memoria por etapa de la ingesta de los zip")
+    parser.add_argument("--lector", default=datos.LECTOR, choices=["pyarrow", "c"])
+    parser.add_argument("--datos", default=".", help="carpeta con los parte_N.csv.zip")
+    parser.add_argument("--json", default="memoria_ingesta.json")
+    args = parser.parse_args()
+
+    informe = ingesta(datos.descubrir_partes(args.datos), args.lector)
+    with open(args.json, "w") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+
+    print(f"{'etapa':<24} {'s':>8} {'pico MB':>9} {'retenido':>9} {'arrow':>9} {'rss pico':>9}")
+    for e in informe["etapas"]:
+        print(
+            f"{e['etapa']:<24} {e['segundos']:8.3f} {e['pico_mb']:9.1f} {e['retenido_mb']:9.1f} "
+            f"{e['arrow_retenido_mb']:9.1f} {e['rss_pico_mb']:9.1f}"
+        )
+    print(f"{informe['filas']:,} filas, {informe['total_mb']:,.1f} MB en memoria")
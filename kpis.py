@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# KPIs de ventas calculados como operaciones por columnas sobre el cubo de
+# agregados. Todas las funciones aceptan cualquier clave del cubo (state,
+# store_nbr, family, year, month...) o una lista de claves, y resuelven la
+# división por cero con máscaras en lugar de apply fila a fila.
+MEDIDAS = ["suma_sales", "suma_transactions", "n"]
+
+
+def _claves(por):
+    if por is None:
+        return []
+    return [por] if isinstance(por, str) else list(por)
+
+
+def dividir(numerador, denominador):
+    if np.ndim(denominador) == 0:
+        return numerador / denominador if denominador != 0 else 0
+    return (numerador / denominador.where(denominador != 0)).fillna(0)
+
+
+def _sumas_promo(agregado, por):
+    claves = _claves(por)
+    columnas = pd.MultiIndex.from_product([MEDIDAS, [False, True]])
+    if not claves:
+        sumas = agregado.groupby("promo")[MEDIDAS].sum().unstack().to_frame().T
+    else:
+        sumas = agregado.groupby(claves + ["promo"], observed=True)[MEDIDAS].sum().unstack("promo", fill_value=0)
+    return sumas.reindex(columns=columnas, fill_value=0)
+
+
+# Una sola agregación por (claves, promo) de la que salen las medias con y sin
+# promoción, el lift, la cuota de ventas en promoción y el ticket medio.
+def promociones(agregado, por=None):
+    sumas = _sumas_promo(agregado, por)
+    ventas_promo = sumas[("suma_sales", True)]
+    ventas_no = sumas[("suma_sales", False)]
+    ventas = ventas_promo + ventas_no
+    transacciones = sumas[("suma_transactions", True)] + sumas[("suma_transactions", False)]
+
+    tabla = pd.DataFrame(index=sumas.index)
+    tabla["no_promo"] = dividir(ventas_no, sumas[("n", False)])
+    tabla["promo"] = dividir(ventas_promo, sumas[("n", True)])
+    tabla["lift"] = (dividir(tabla["promo"], tabla["no_promo"]) - 1).where(tabla["no_promo"] != 0, 0)
+    tabla["ventas"] = ventas
+    tabla["cuota_promo"] = dividir(ventas_promo, ventas) * 100
+    tabla["ticket"] = dividir(ventas, transacciones)
+
+    if not _claves(por):
+        return tabla.iloc[0]
+    return tabla.reset_index()
+
+
+def yoy(agregado, por=None):
+    claves = _claves(por)
+    tabla = (
+        agregado.groupby(claves + ["year"], observed=True)["suma_sales"]
+        .sum()
+        .rename("ventas_totales")
+        .reset_index()
+        .sort_values(claves + ["year"])
+    )
+    anterior = tabla.groupby(claves)["ventas_totales"].shift() if claves else tabla["ventas_totales"].shift()
+    tabla["yoy_pct"] = (tabla["ventas_totales"] / anterior - 1) * 100
+    return tabla
+
+
+def pareto(agregado, por, umbral=80):
+    tabla = (
+        agregado.groupby(por, observed=True)["suma_sales"]
+        .sum()
+        .sort_values(ascending=False)
+        .rename("ventas")
+        .reset_index()
+    )
+    total = tabla["ventas"].sum()
+    tabla["pct_acum"] = dividir(tabla["ventas"].cumsum(), total) * 100
+    tabla["rank"] = np.arange(1, len(tabla) + 1)
+    n_umbral = int((tabla["pct_acum"] <= umbral).sum())
+    return tabla, n_umbral
@@ -0,0 +1,216 @@
+import pandas as pd
+
+import agregados
+import datos
+import graficos
+import kpis
+from agregados import resumir
+
+# Motor de análisis del dashboard, sin Streamlit: cada función recibe el
+# ConjuntoDatos y los valores de los filtros y devuelve la tabla (o los valores)
+# que muestra una sección. app.py solo elige filtros y pinta el resultado, así
+# que estas funciones se pueden importar, cachear, medir o ejecutar en paralelo
+# fuera de la interfaz.
+ORDEN_DIAS_EN = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+ORDEN_DIAS_ES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+TOP = 10
+TOP_PARETO = 50
+VARIANTES = ["mean", "sum"]
+DIMENSIONES_LIFT = ["state", "store_nbr", "family", "month"]
+
+
+def tiendas(conjunto):
+    return sorted(conjunto.cortes["store_nbr"])
+
+
+def estados(conjunto):
+    return sorted(conjunto.cortes["state"])
+
+
+def cubo_tienda(conjunto, tienda):
+    return datos.cortar(conjunto.cubo, conjunto.cortes["store_nbr"], tienda)
+
+
+def cubo_estado(conjunto, estado):
+    return datos.cortar(conjunto.cubo, conjunto.cortes["state"], estado)
+
+
+def info_dataset(conjunto):
+    cubo = conjunto.cubo
+    return {
+        "filas": int(cubo["n"].sum()),
+        "tiendas": cubo["store_nbr"].nunique(),
+        "productos": cubo["family"].nunique(),
+        "estados": cubo["state"].nunique(),
+        "años": sorted(cubo["year"].unique()),
+        "meses": len(cubo[["year", "month"]].drop_duplicates()),
+    }
+
+
+# Visión global
+
+def top_productos(conjunto, variante):
+    return conjunto.rankings["family"][variante].head(TOP)
+
+
+def ventas_tiendas(conjunto, variante):
+    return conjunto.rankings["store_nbr"][variante]
+
+
+def histograma_tiendas(conjunto, variante):
+    return graficos.histograma(ventas_tiendas(conjunto, variante)["sales"], maxbins=30)
+
+
+def top_tiendas_promo(conjunto, variante):
+    return conjunto.rankings["store_nbr_promo"][variante].head(TOP)
+
+
+def orden_dias(conjunto):
+    dias_presentes = set(conjunto.calendario["day_of_week"].dropna().unique())
+    return ORDEN_DIAS_ES if set(ORDEN_DIAS_ES).issubset(dias_presentes) else ORDEN_DIAS_EN
+
+
+def ventas_dia_semana(conjunto):
+    return resumir(conjunto.calendario, "day_of_week", estadistico="mean")
+
+
+def ventas_semana(conjunto):
+    return resumir(conjunto.calendario, "week", estadistico="mean").sort_values("week")
+
+
+def ventas_mes(conjunto):
+    return resumir(conjunto.cubo, "month", estadistico="mean").sort_values("month")
+
+
+# Análisis por tienda
+
+def ventas_anuales_tienda(conjunto, tienda):
+    return resumir(cubo_tienda(conjunto, tienda), "year").sort_values("year")
+
+
+def unidades_tienda(conjunto, tienda):
+    cubo = cubo_tienda(conjunto, tienda)
+    return int(round(cubo["suma_sales"].sum())), int(round(cubo[cubo["promo"]]["suma_sales"].sum()))
+
+
+def ventas_mensuales_tienda(conjunto, tienda):
+    tabla = resumir(cubo_tienda(conjunto, tienda), ["year", "month"])
+    tabla["ym"] = tabla["year"].astype(str) + "-" + tabla["month"].astype(str).str.zfill(2)
+    return tabla[["ym", "sales"]]
+
+
+def productos_tienda(conjunto, tienda):
+    return resumir(cubo_tienda(conjunto, tienda), "family").sort_values("sales", ascending=False)
+
+
+# Análisis por estado
+
+def transacciones_anuales_estado(conjunto, estado):
+    return resumir(cubo_estado(conjunto, estado), "year", medida="transactions").sort_values("year")
+
+
+def ventas_tiendas_estado(conjunto, estado):
+    return resumir(cubo_estado(conjunto, estado), "store_nbr").sort_values("sales", ascending=False)
+
+
+# Información avanzada
+
+def resumen_avanzado(conjunto):
+    por_dia = ventas_dia_semana(conjunto).set_index("day_of_week")["sales"]
+    por_mes = ventas_mes(conjunto).set_index("month")["sales"]
+    ventas_estado = resumir(conjunto.cubo, "state").set_index("state")["sales"].sort_values(ascending=False)
+    total = ventas_estado.sum()
+    return {
+        "mejor_dia": por_dia.idxmax(),
+        "mejor_mes": int(por_mes.idxmax()),
+        "estado_top": ventas_estado.index[0],
+        "pct_estado_top": ventas_estado.iloc[0] / total * 100 if total != 0 else 0,
+        "promociones": kpis.promociones(conjunto.cubo),
+    }
+
+
+def ventas_promo(conjunto):
+    return resumir(conjunto.cubo, "promo", estadistico="mean").rename(columns={"sales": "ventas_medias"})
+
+
+def top_lift(conjunto, clave):
+    return (
+        kpis.promociones(conjunto.cubo, clave)[[clave, "no_promo", "promo", "lift"]]
+        .sort_values("lift", ascending=False)
+        .head(TOP)
+    )
+
+
+def ventas_festivos(conjunto):
+    return (
+        resumir(conjunto.calendario, "holiday_type", estadistico="mean")
+        .rename(columns={"sales": "ventas_medias"})
+        .sort_values("ventas_medias", ascending=False)
+    )
+
+
+def crecimiento_anual(conjunto):
+    return kpis.yoy(conjunto.cubo)
+
+
+def concentracion(conjunto, clave):
+    tabla, n_umbral = conjunto.paretos[clave]
+    return tabla.head(TOP_PARETO), n_umbral
+
+
+# Todas las tablas del dashboard para todos los valores de sus filtros (variante
+# media/total, cada tienda, cada estado, cada dimensión). Las de un mismo tipo
+# se apilan en una sola tabla con el filtro como columna; en lift y Pareto la
+# clave, que cambia de columna según la dimensión, pasa a "valor" como texto.
+
+def _apilar(funcion, conjunto, filtro, valores):
+    return pd.concat(
+        [funcion(conjunto, valor).assign(**{filtro: valor}) for valor in valores],
+        ignore_index=True,
+    )
+
+
+def _por_dimension(funcion, conjunto, claves):
+    partes = []
+    for clave in claves:
+        tabla = funcion(conjunto, clave)
+        if isinstance(tabla, tuple):
+            tabla = tabla[0]
+        partes.append(tabla.rename(columns={clave: "valor"}).astype({"valor": str}).assign(dimension=clave))
+    return pd.concat(partes, ignore_index=True)
+
+
+def todas_las_tablas(conjunto):
+    tiendas_ = tiendas(conjunto)
+    estados_ = estados(conjunto)
+    return {
+        "top_productos": _apilar(top_productos, conjunto, "variante", VARIANTES),
+        "ventas_tiendas": _apilar(ventas_tiendas, conjunto, "variante", VARIANTES),
+        "histograma_tiendas": _apilar(histograma_tiendas, conjunto, "variante", VARIANTES),
+        "top_tiendas_promo": _apilar(top_tiendas_promo, conjunto, "variante", VARIANTES),
+        "ventas_dia_semana": ventas_dia_semana(conjunto),
+        "ventas_semana": ventas_semana(conjunto),
+        "ventas_mes": ventas_mes(conjunto),
+        "ventas_anuales_tienda": _apilar(ventas_anuales_tienda, conjunto, "tienda", tiendas_),
+        "ventas_mensuales_tienda": _apilar(ventas_mensuales_tienda, conjunto, "tienda", tiendas_),
+        "productos_tienda": _apilar(productos_tienda, conjunto, "tienda", tiendas_),
+        "transacciones_anuales_estado": _apilar(transacciones_anuales_estado, conjunto, "estado", estados_),
+        "ventas_tiendas_estado": _apilar(ventas_tiendas_estado, conjunto, "estado", estados_),
+        "ventas_promo": ventas_promo(conjunto),
+        "top_lift": _por_dimension(top_lift, conjunto, DIMENSIONES_LIFT),
+        "ventas_festivos": ventas_festivos(conjunto),
+        "crecimiento_anual": crecimiento_anual(conjunto),
+        "concentracion": _por_dimension(concentracion, conjunto, agregados.CLAVES_PARETO),
+    }
+
+
+# Valores sueltos (métricas) del dashboard, serializables a JSON
+def todos_los_valores(conjunto):
+    resumen = resumen_avanzado(conjunto)
+    resumen["promociones"] = resumen["promociones"].to_dict()
+    return {
+        "info_dataset": info_dataset(conjunto),
+        "resumen_avanzado": resumen,
+        "unidades_tienda": {tienda: unidades_tienda(conjunto, tienda) for tienda in tiendas(conjunto)},
+        "concentracion_80": {clave: concentracion(conjunto, clave)[1] for clave in agregados.CLAVES_PARETO},
+    }
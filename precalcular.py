@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import agregados
+import carga
+import datos
+import motor
+
+# Precálculo fuera de línea de todo lo que muestra el dashboard, pensado para un
+# proceso nocturno en una máquina grande. Lee los zip, construye el cubo y el
+# calendario y los guarda en la carpeta de salida junto con todas las tablas y
+# métricas de motor.py para todas las tiendas, estados y dimensiones:
+#
+#   salida/cubo_ventas.arrow, salida/cubo_calendario.arrow
+#   salida/tablas/<tabla>.arrow
+#   salida/valores.json
+#
+# El dashboard arrancado con VENTAS_PRECALCULADO=salida solo carga el cubo y el
+# calendario de esa carpeta, sin leer ni hashear los zip. Si la carpeta ya tiene
+# agregados y solo han llegado partes nuevas, solo se procesan esas partes.
+#
+#   python precalcular.py --datos /ruta/a/los/zip --salida precalculado
+
+
+def construir(rutas, modo="completo", salida="precalculado"):
+    huella = datos.huella_archivos(rutas)
+    os.makedirs(salida, exist_ok=True)
+    cubo, calendario = carga.construir_agregados(huella, modo, salida, {}, {}, snapshot_filas=False)
+    return agregados.ConjuntoDatos(huella, cubo, calendario)
+
+
+def exportar(conjunto, salida):
+    os.makedirs(os.path.join(salida, "tablas"), exist_ok=True)
+    for nombre, tabla in motor.todas_las_tablas(conjunto).items():
+        feather.write_feather(
+            pa.Table.from_pandas(tabla, preserve_index=False),
+            os.path.join(salida, "tablas", f"{nombre}.arrow"),
+            compression="uncompressed",
+        )
+    with open(os.path.join(salida, "valores.json"), "w") as f:
+        json.dump(
+            motor.todos_los_valores(conjunto), f, indent=2, ensure_ascii=False,
+            default=lambda valor: valor.item() if hasattr(valor, "item") else str(valor),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precalcula todas las tablas del dashboard")
+    parser.add_argument("--datos", default=".", help="carpeta con los parte_N.csv.zip")
+    parser.add_argument("--salida", default="precalculado")
+    parser.add_argument("--modo", default="completo", choices=["completo", "agregados"])
+    args = parser.parse_args()
+
+    partes = datos.descubrir_partes(args.datos)
+    if not partes:
+        parser.error(f"no se ha encontrado ningún fichero {datos.PATRON_PARTES} en {args.datos}")
+
+    inicio = time.perf_counter()
+    conjunto = construir(partes, args.modo, args.salida)
+    exportar(conjunto, args.salida)
+    print(
+        f"{int(conjunto.cubo['n'].sum()):,} filas -> {len(conjunto.cubo):,} celdas de cubo en "
+        f"{args.salida} ({time.perf_counter() - inicio:.1f} s)"
+    )
@@ -0,0 +1,92 @@
+import os
+import threading
+from dataclasses import dataclass, field
+
+# Recarga en caliente del conjunto de datos sin reiniciar el servidor. Un hilo
+# comprueba cada pocos segundos una firma barata de los ficheros de origen (ruta,
+# tamaño y fecha de modificación, sin leerlos); cuando cambia, construye el
+# conjunto nuevo en segundo plano mientras las sesiones siguen leyendo el actual
+# y lo sustituye con una única asignación de `vigente`. Cada rerun lee `vigente`
+# una vez al principio, así que nunca mezcla dos versiones, y la anterior se
+# libera en cuanto termina el último rerun que la estaba usando. Con intervalo 0
+# no hay hilo y quien lo use llama a comprobar() cuando quiera (por ejemplo, en
+# cada rerun). parar() termina el hilo.
+
+
+def firma(rutas):
+    firma_ = []
+    for ruta in rutas:
+        try:
+            info = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        firma_.append((ruta, info.st_size, info.st_mtime_ns))
+    return tuple(firma_)
+
+
+# Cada versión lleva el origen y los tiempos de su propia construcción, que
+# construir(tiempos, estado) anota en dos diccionarios nuevos
+@dataclass(frozen=True)
+class Version:
+    conjunto: object
+    numero: int
+    origen: str
+    tiempos: dict = field(default_factory=dict)
+
+
+class Vigilante:
+    def __init__(self, leer_firma, construir, intervalo, al_cambiar=None):
+        self._leer_firma = leer_firma
+        self._construir = construir
+        self._al_cambiar = al_cambiar
+        self._parar = threading.Event()
+        self._cerrojo = threading.Lock()
+        self.firma = leer_firma()
+        self.vigente = self._construir_version(1)
+        self.error = None
+        if intervalo > 0:
+            threading.Thread(target=self._vigilar, args=(intervalo,), daemon=True, name="recarga-datos").start()
+
+    @property
+    def actual(self):
+        return self.vigente.conjunto
+
+    @property
+    def version(self):
+        return self.vigente.numero
+
+    def _construir_version(self, numero):
+        tiempos, estado = {}, {}
+        conjunto = self._construir(tiempos, estado)
+        return Version(conjunto, numero, estado["origen"], tiempos)
+
+    def _vigilar(self, intervalo):
+        while not self._parar.wait(intervalo):
+            self.comprobar()
+
+    def parar(self):
+        self._parar.set()
+
+    # Si la construcción falla (por ejemplo, un zip a medio copiar) se conserva
+    # la versión actual y se vuelve a intentar cuando la firma cambie otra vez.
+    # El cerrojo evita que dos llamadas a la vez construyan la misma versión.
+    def comprobar(self):
+        with self._cerrojo:
+            return self._comprobar()
+
+    def _comprobar(self):
+        firma_ = self._leer_firma()
+        if firma_ == self.firma:
+            return False
+        try:
+            nueva = self._construir_version(self.version + 1)
+        except Exception as error:
+            self.firma = firma_
+            self.error = f"{type(error).__name__}: {error}"
+            return False
+        self.firma = firma_
+        self.error = None
+        self.vigente = nueva
+        if self._al_cambiar is not None:
+            self._al_cambiar()
+        return True
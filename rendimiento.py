@@ -0,0 +1,49 @@
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Medidas de rendimiento para el panel de depuración del dashboard y los
+# benchmarks: cronómetros que acumulan segundos en un diccionario por nombre y
+# la memoria residente del proceso.
+
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def cronometro(registro, nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro[nombre] = registro.get(nombre, 0) + time.perf_counter() - inicio
+
+
+# Ejecuta accion() mientras un hilo muestrea la memoria residente cada pocos
+# milisegundos; devuelve el resultado, la duración y el pico observado.
+def medir(accion, intervalo=0.005):
+    pico = [rss()]
+    terminado = threading.Event()
+
+    def muestrear():
+        while not terminado.is_set():
+            pico[0] = max(pico[0], rss())
+            time.sleep(intervalo)
+
+    hilo = threading.Thread(target=muestrear, daemon=True)
+    hilo.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = accion()
+    finally:
+        duracion = time.perf_counter() - inicio
+        terminado.set()
+        hilo.join()
+    return resultado, duracion, max(pico[0], rss())
@@ -0,0 +1,87 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import agregados
+import datos
+import generar_datos
+
+
+def agregar_todo(rutas):
+    df = datos.derivar_columnas(datos.limpiar_datos(datos.cargar_datos(rutas)))
+    return agregados.agregar(*datos.separar_fechas(df))
+
+
+def normalizar(agregado, claves):
+    agregado = agregado.copy()
+    for col in agregado.columns:
+        if isinstance(agregado[col].dtype, pd.CategoricalDtype):
+            agregado[col] = agregado[col].astype(str)
+    return agregado.sort_values(claves, ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def partes(tmp_path_factory):
+    return generar_datos.generar(30_000, str(tmp_path_factory.mktemp("partes")), partes=3)
+
+
+# Los agregados de las partes 1 y 2 más la parte 3 añadida después tienen que
+# coincidir con los de las tres partes agregadas desde cero
+@pytest.mark.parametrize("modo", ["completo", "agregados"])
+def test_incremental_igual_que_desde_cero(partes, tmp_path, modo):
+    agregados.guardar(*agregar_todo(partes[:2]), datos.huella_archivos(partes[:2]), str(tmp_path))
+
+    actualizados = agregados.actualizar(datos.huella_archivos(partes), str(tmp_path), modo)
+    assert actualizados is not None
+    completos = agregar_todo(partes)
+
+    for incremental, desde_cero, claves in zip(
+        actualizados, completos, [agregados.CLAVES_CUBO, agregados.CLAVES_CALENDARIO]
+    ):
+        pd.testing.assert_frame_equal(
+            normalizar(incremental, claves),
+            normalizar(desde_cero, claves),
+            check_dtype=False,
+            check_exact=False,
+            rtol=1e-6,
+        )
+
+
+def test_combinar_suma_celdas_comunes():
+    a = pd.DataFrame({"family": ["X", "Y"], "suma_sales": [1.0, 2.0], "n": [1, 1]})
+    b = pd.DataFrame({"family": ["Y", "Z"], "suma_sales": [3.0, 4.0], "n": [2, 1]})
+    combinado = agregados.combinar(a, b, ["family"]).set_index("family")
+    assert combinado["suma_sales"].to_dict() == {"X": 1.0, "Y": 5.0, "Z": 4.0}
+    assert combinado["n"].to_dict() == {"X": 1, "Y": 3, "Z": 1}
+
+
+def test_actualizar_sin_partes_nuevas(partes, tmp_path):
+    huella = datos.huella_archivos(partes)
+    agregados.guardar(*agregar_todo(partes), huella, str(tmp_path))
+    assert agregados.actualizar(huella, str(tmp_path)) is None
+
+
+# DuckDB tiene que dar los mismos agregados que pandas: sobre las tablas de los
+# zip, sobre el frame ya limpio con la dimensión de fechas (como el snapshot) y
+# por trozos en streaming
+def test_duckdb_igual_que_pandas(partes):
+    pytest.importorskip("duckdb")
+    esperados = agregar_todo(partes)
+    df, fechas = datos.separar_fechas(datos.derivar_columnas(datos.limpiar_datos(datos.cargar_datos(partes))))
+    variantes = {
+        "zip": agregados.agregar_duckdb(datos.cargar_tabla(partes)),
+        "snapshot": agregados.agregar_duckdb(pa.Table.from_pandas(df, preserve_index=False), fechas),
+        "trozos": agregados.agregar_por_trozos(partes, filas=7_000, motor="duckdb"),
+    }
+    for nombre, obtenidos in variantes.items():
+        for obtenido, esperado, claves in zip(
+            obtenidos, esperados, [agregados.CLAVES_CUBO, agregados.CLAVES_CALENDARIO]
+        ):
+            pd.testing.assert_frame_equal(
+                normalizar(obtenido, claves)[esperado.columns],
+                normalizar(esperado, claves),
+                check_dtype=False,
+                check_exact=False,
+                rtol=1e-6,
+                obj=nombre,
+            )
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+import agregados
+import carga
+import datos
+
+HUELLA = (("parte_1.csv.zip", 10, 0, "a"),)
+OTRA_HUELLA = (("parte_1.csv.zip", 10, 0, "a"), ("parte_2.csv.zip", 20, 0, "b"))
+
+
+def agregados_pequenos():
+    filas = pd.DataFrame({
+        "state": ["Azuay", "Guayas"], "store_nbr": [1, 2], "family": "GROCERY I", "year": 2017, "month": 1,
+        "promo": False, "week": 1, "day_of_week": "Monday", "holiday_type": "", "sales": [1.0, 2.0],
+        "transactions": 1.0,
+    })
+    return agregados.agregar(filas)
+
+
+def test_precalculado_carga_el_cubo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("precalculado")
+    agregados.guardar(*agregados_pequenos(), HUELLA, "precalculado")
+    estado = {}
+    conjunto = carga.construir_conjunto("completo", "precalculado", {}, estado)
+    assert estado["origen"] == "cubo"
+    assert conjunto.huella == HUELLA
+
+
+# precalcular.py a mitad de sustituir el par: el cubo ya es nuevo y el calendario
+# aún no. No se tiene que intentar leer los zip de la huella ni escribir nada.
+def test_precalculado_con_par_a_medias(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("precalculado")
+    cubo, calendario = agregados_pequenos()
+    agregados.guardar(cubo, calendario, HUELLA, "precalculado")
+    datos.guardar_snapshot(cubo, OTRA_HUELLA, os.path.join("precalculado", agregados.RUTA_CUBO), agregados.VERSION_CUBO)
+    antes = sorted(os.listdir("precalculado"))
+
+    with pytest.raises(FileNotFoundError, match="precalculados"):
+        carga.construir_conjunto("completo", "precalculado", {}, {})
+    assert sorted(os.listdir("precalculado")) == antes
+    assert not os.path.exists(datos.RUTA_SNAPSHOT)
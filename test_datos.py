@@ -0,0 +1,143 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import agregados
+import datos
+import generar_datos
+import motor
+
+
+def cubo(estados, tiendas):
+    filas = pd.DataFrame({
+        "state": pd.Series(estados, dtype="category"),
+        "store_nbr": tiendas,
+        "family": "GROCERY I",
+        "year": 2017,
+        "month": 1,
+        "promo": False,
+        "week": 1,
+        "day_of_week": "Monday",
+        "holiday_type": "",
+        "sales": np.arange(1.0, len(tiendas) + 1),
+        "transactions": 1.0,
+    })
+    return agregados.agregar(filas)
+
+
+# Cada corte tiene que devolver las mismas celdas que el filtro booleano
+def comprobar_cortes(df, columna):
+    cortes = datos.indice_cortes(df, columna)
+    for valor in df[columna].dropna().unique():
+        pd.testing.assert_frame_equal(datos.cortar(df, cortes, valor), df[df[columna] == valor])
+
+
+def test_cortes_contiguos_son_vistas():
+    df = datos.ordenar_datos(pd.DataFrame({"state": ["B", "A", "B", "A"], "store_nbr": [3, 1, 4, 2]}), ["state"])
+    cortes = datos.indice_cortes(df, "state")
+    assert cortes == {"A": slice(0, 2), "B": slice(2, 4)}
+    comprobar_cortes(df, "state")
+    assert datos.cortar(df, cortes, "C").empty
+
+
+def test_tienda_en_dos_estados():
+    cubo_, calendario = cubo(["Azuay", "Guayas", "Pichincha"], [1, 2, 1])
+    cortes = datos.indice_cortes(cubo_, "store_nbr")
+    assert isinstance(cortes[1], np.ndarray)
+    comprobar_cortes(cubo_, "store_nbr")
+    comprobar_cortes(cubo_, "state")
+
+    conjunto = agregados.ConjuntoDatos((), cubo_, calendario)
+    assert motor.tiendas(conjunto) == [1, 2]
+    assert motor.cubo_tienda(conjunto, 1)["suma_sales"].sum() == 4.0
+
+
+def test_tienda_con_estado_vacio():
+    cubo_, calendario = cubo(["Azuay", None, "Guayas"], [1, 1, 2])
+    comprobar_cortes(cubo_, "store_nbr")
+    conjunto = agregados.ConjuntoDatos((), cubo_, calendario)
+    assert motor.estados(conjunto) == ["Azuay", "Guayas"]
+    assert motor.cubo_tienda(conjunto, 1)["suma_sales"].sum() == 3.0
+
+
+def escribir_zip(filas, ruta):
+    with zipfile.ZipFile(ruta, "w") as z:
+        z.writestr("parte_1.csv", filas[generar_datos.COLUMNAS].to_csv(index=False))
+    return str(ruta)
+
+
+def cubo_ordenado(cubo_):
+    return cubo_.astype({col: str for col in datos.COLUMNAS_TEXTO if col in cubo_}).sort_values(
+        agregados.CLAVES_CUBO, ignore_index=True
+    )
+
+
+# Dos filas sin fecha de meses distintos: el modo completo (dimensión de fechas)
+# y el de solo agregados (atributos de cada fila) tienen que dar el mismo cubo
+@pytest.mark.parametrize("lector", ["c", "pyarrow"])
+def test_filas_sin_fecha_en_los_dos_modos(tmp_path, lector):
+    filas = pd.DataFrame({
+        "date": ["2015-03-02", "", "", "2016-07-04"],
+        "store_nbr": 1,
+        "family": "GROCERY I",
+        "sales": [1.0, 2.0, 3.0, 4.0],
+        "onpromotion": 0,
+        "transactions": 1.0,
+        "state": "Azuay",
+        "holiday_type": "",
+        "year": [2015, 2015, 2016, 2016],
+        "month": [3, 3, 7, 7],
+        "week": [10, 10, 27, 27],
+        "day_of_week": "Monday",
+    })
+    ruta = escribir_zip(filas, tmp_path / "parte_1.csv.zip")
+
+    df = datos.derivar_columnas(datos.limpiar_datos(datos.cargar_datos([ruta], lector)))
+    completo, _ = agregados.agregar(*datos.separar_fechas(df))
+    trozos, _ = agregados.agregar_por_trozos([ruta], motor="pandas")
+
+    pd.testing.assert_frame_equal(cubo_ordenado(completo), cubo_ordenado(trozos), check_dtype=False)
+    assert completo.set_index(["year", "month"])["suma_sales"].to_dict() == {(2015, 3): 3.0, (2016, 7): 7.0}
+
+
+# Textos con espacios, marcas de nulo y vacíos, como en los CSV originales
+@pytest.fixture
+def zip_sucio(tmp_path):
+    filas = pd.DataFrame({
+        "date": ["2015-03-02", "2015-03-02", "2015-03-03", "2015-03-03"],
+        "store_nbr": [1, 2, 1, 2],
+        "family": ["GROCERY I", " GROCERY I ", "BEVERAGES", "NA"],
+        "sales": [1.0, None, 3.5, 4.0],
+        "onpromotion": [0, 2, None, 1],
+        "transactions": [10.0, 20.0, None, 40.0],
+        "state": ["Azuay", "Guayas ", "", "Azuay"],
+        "holiday_type": ["", "Holiday", "Event", "NULL"],
+        "year": 2015,
+        "month": 3,
+        "week": 10,
+        "day_of_week": ["Monday", "Monday", "Tuesday", "Tuesday"],
+    })
+    return escribir_zip(filas, tmp_path / "parte_1.csv.zip")
+
+
+@pytest.mark.parametrize("lector", ["c", "pyarrow"])
+def test_esquema_al_leer(zip_sucio, lector):
+    df = datos.limpiar_datos(datos.cargar_datos([zip_sucio], lector))
+    tipos = datos.esquema()
+    for col in datos.COLUMNAS_TEXTO + list(datos.TIPOS_ENTEROS) + datos.MEDIDAS:
+        assert str(df[col].dtype) == tipos[col], col
+    assert df["family"].cat.categories.tolist() == ["BEVERAGES", "GROCERY I"]
+    assert df["state"].isna().tolist() == [False, False, True, False]
+    assert df["sales"].tolist() == [1.0, 0.0, 3.5, 4.0]
+
+
+# Los dos lectores tienen que dar el mismo frame limpio, con las mismas categorías
+def test_lectores_c_y_pyarrow_iguales(zip_sucio, tmp_path):
+    rutas = [zip_sucio] + generar_datos.generar(5_000, str(tmp_path / "generados"), partes=2)
+    c = datos.limpiar_datos(datos.cargar_datos(rutas, "c"))
+    arrow = datos.limpiar_datos(datos.cargar_datos(rutas, "pyarrow"))
+    for col in datos.COLUMNAS_TEXTO:
+        assert c[col].cat.categories.equals(arrow[col].cat.categories), col
+    pd.testing.assert_frame_equal(c[datos.COLUMNAS], arrow[datos.COLUMNAS], check_dtype=False)
@@ -0,0 +1,53 @@
+import altair as alt
+import numpy as np
+import pandas as pd
+import pytest
+
+import graficos
+
+
+def test_histograma_cuenta_todos_los_valores():
+    valores = pd.Series([0.5, 1.2, 3.7, 3.9, 10.0, np.nan])
+    tabla = graficos.histograma(valores, maxbins=30)
+    assert tabla["n"].sum() == 5
+    assert len(tabla) <= 30
+    pasos = (tabla["fin"] - tabla["inicio"]).round(9).unique()
+    assert len(pasos) == 1 and pasos[0] in (0.1, 0.2, 0.5, 1.0)
+    assert tabla["inicio"].iloc[0] <= 0.5 and tabla["fin"].iloc[-1] > 10.0
+
+
+# Mismos recuentos que np.histogram con los bordes de la tabla
+def test_histograma_como_numpy():
+    valores = np.random.default_rng(0).lognormal(3, 1, 1000)
+    tabla = graficos.histograma(valores, maxbins=20)
+    bordes = np.append(tabla["inicio"].to_numpy(), tabla["fin"].iloc[-1])
+    assert tabla["n"].tolist() == np.histogram(valores, bins=bordes)[0].tolist()
+    assert len(tabla) <= 20
+
+
+def test_histograma_casos_limite():
+    assert graficos.histograma(pd.Series([], dtype=float)).empty
+    tabla = graficos.histograma([7.0, 7.0, 7.0])
+    assert tabla["n"].sum() == 3
+
+
+def test_limitar_muestrea_filas_equiespaciadas():
+    df = pd.DataFrame({"x": range(100)})
+    assert graficos.limitar(df, max_filas=100) is df
+    muestra = graficos.limitar(df, max_filas=10, politica="muestrear")
+    assert len(muestra) == 10
+    assert muestra["x"].iloc[0] == 0 and muestra["x"].iloc[-1] == 99
+
+
+def test_limitar_con_politica_error():
+    with pytest.raises(ValueError, match="máximo"):
+        graficos.limitar(pd.DataFrame({"x": range(11)}), max_filas=10, politica="error")
+
+
+def test_especificacion_acota_todas_las_capas():
+    df = pd.DataFrame({"x": range(1000), "y": range(1000)})
+    base = alt.Chart(df).mark_line().encode(x="x:Q", y="y:Q")
+    regla = alt.Chart(pd.DataFrame({"y": [500]})).mark_rule().encode(y="y:Q")
+    espec = graficos.especificacion(base + regla, "prueba", max_filas=50, politica="muestrear")
+    assert sorted(len(filas) for filas in espec["datasets"].values()) == [1, 50]
+    assert graficos.filas(espec) == 51
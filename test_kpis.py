@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import agregados
+import kpis
+
+# Casos con denominador cero: A tiene filas con y sin promoción, B solo en
+# promoción, C solo sin promoción, D vende 0 sin promoción y E no tiene
+# transacciones.
+FILAS = pd.DataFrame({
+    "state": ["A", "A", "A", "B", "B", "C", "C", "D", "D", "E", "E"],
+    "sales": [10.0, 20.0, 45.0, 8.0, 4.0, 6.0, 9.0, 0.0, 7.0, 3.0, 5.0],
+    "transactions": [2.0, 4.0, 5.0, 1.0, 1.0, 3.0, 3.0, 2.0, 2.0, 0.0, 0.0],
+    "promo": [False, False, True, True, True, False, False, False, True, False, True],
+})
+
+
+def cubo(filas):
+    filas = filas.assign(
+        store_nbr=1, family="GROCERY I", year=2017, month=1, week=1, day_of_week="Monday", holiday_type=""
+    )
+    return agregados.categorizar(agregados.agregar(filas)[0])
+
+
+# Fórmula original del dashboard: medias por estado y promoción con pivot y el
+# lift fila a fila con apply
+def lift_apply(filas):
+    tabla = (
+        filas.groupby(["state", "promo"])["sales"].mean().reset_index()
+        .pivot(index="state", columns="promo", values="sales")
+        .rename(columns={False: "no_promo", True: "promo"})
+    )
+    tabla = tabla.fillna(0)
+    tabla["lift"] = tabla.apply(lambda x: (x["promo"] / x["no_promo"]) - 1 if x["no_promo"] != 0 else 0, axis=1)
+    return tabla
+
+
+def test_dividir_escalar_por_cero():
+    assert kpis.dividir(5.0, 0) == 0
+    assert kpis.dividir(6.0, 3) == 2
+
+
+def test_dividir_serie_por_cero():
+    resultado = kpis.dividir(pd.Series([1.0, 2.0, 0.0]), pd.Series([0.0, 4.0, 0.0]))
+    assert resultado.tolist() == [0.0, 0.5, 0.0]
+
+
+def test_promociones_por_estado_como_apply():
+    esperado = lift_apply(FILAS)
+    tabla = kpis.promociones(cubo(FILAS), "state").set_index("state")
+    tabla.index = tabla.index.astype(str)
+    for columna in ["no_promo", "promo", "lift"]:
+        np.testing.assert_allclose(tabla[columna], esperado.loc[tabla.index, columna])
+    assert tabla.loc["B", "lift"] == 0
+    assert tabla.loc["C", "lift"] == -1
+    assert tabla.loc["D", "lift"] == 0
+    assert tabla.loc["E", "ticket"] == 0
+
+
+def test_promociones_global():
+    resultado = kpis.promociones(cubo(FILAS))
+    promo = FILAS["promo"]
+    assert resultado["promo"] == pytest.approx(FILAS.loc[promo, "sales"].mean())
+    assert resultado["no_promo"] == pytest.approx(FILAS.loc[~promo, "sales"].mean())
+    assert resultado["cuota_promo"] == pytest.approx(FILAS.loc[promo, "sales"].sum() / FILAS["sales"].sum() * 100)
+    assert resultado["ticket"] == pytest.approx(FILAS["sales"].sum() / FILAS["transactions"].sum())
+
+
+def test_promociones_sin_ventas_ni_transacciones():
+    resultado = kpis.promociones(cubo(FILAS.assign(sales=0.0, transactions=0.0)))
+    assert resultado[["no_promo", "promo", "lift", "cuota_promo", "ticket"]].tolist() == [0, 0, 0, 0, 0]
@@ -0,0 +1,71 @@
+import threading
+
+import recarga
+
+
+# Firma y construcción simuladas: cada versión del "origen" es un número y el
+# conjunto construido es una tupla con él
+class Origen:
+    def __init__(self):
+        self.valor = 1
+        self.fallar = False
+
+    def firma(self):
+        return self.valor
+
+    def construir(self, tiempos, estado):
+        if self.fallar:
+            raise OSError("zip a medio copiar")
+        tiempos["carga: construir"] = 0.1
+        estado["origen"] = "zip"
+        return ("conjunto", self.valor)
+
+
+def test_sin_cambios_no_reconstruye():
+    origen = Origen()
+    vigilante = recarga.Vigilante(origen.firma, origen.construir, 0)
+    anterior = vigilante.vigente
+    assert vigilante.comprobar() is False
+    assert vigilante.vigente is anterior
+
+
+def test_sustituye_la_version_al_cambiar():
+    origen = Origen()
+    cambios = []
+    vigilante = recarga.Vigilante(origen.firma, origen.construir, 0, lambda: cambios.append(1))
+    origen.valor = 2
+    assert vigilante.comprobar() is True
+    assert vigilante.actual == ("conjunto", 2)
+    assert vigilante.version == 2
+    assert vigilante.vigente.origen == "zip"
+    assert vigilante.vigente.tiempos == {"carga: construir": 0.1}
+    assert cambios == [1]
+
+
+def test_conserva_la_version_si_falla():
+    origen = Origen()
+    vigilante = recarga.Vigilante(origen.firma, origen.construir, 0)
+    anterior = vigilante.vigente
+    origen.valor, origen.fallar = 2, True
+    assert vigilante.comprobar() is False
+    assert vigilante.vigente is anterior
+    assert "zip a medio copiar" in vigilante.error
+
+    # Con la misma firma no se reintenta; cuando vuelve a cambiar, sí
+    origen.fallar = False
+    assert vigilante.comprobar() is False
+    origen.valor = 3
+    assert vigilante.comprobar() is True
+    assert vigilante.actual == ("conjunto", 3)
+    assert vigilante.error is None
+
+
+def test_parar_termina_el_hilo():
+    origen = Origen()
+    vigilante = recarga.Vigilante(origen.firma, origen.construir, 0.01)
+    hilos = [hilo for hilo in threading.enumerate() if hilo.name == "recarga-datos"]
+    assert hilos
+    vigilante.parar()
+    for hilo in hilos:
+        hilo.join(timeout=1)
+    assert not any(hilo.is_alive() for hilo in hilos)